@@ -1,3 +1,6 @@
+import types
+
+
 class Variable():
 
     ACROSS = "across"
@@ -35,6 +38,16 @@ class Variable():
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+class Overlaps(dict):
+    """
+    Overlaps between pairs of variables, only storing pairs that do
+    overlap: looking up any other pair gives None.
+    """
+
+    def __missing__(self, key):
+        return None
+
+
 class Crossword():
 
     def __init__(self, structure_file, words_file):
@@ -104,30 +117,33 @@ class Crossword():
                             length=length
                         ))
 
+        # Index the variables covering each cell, with the position of
+        # the cell in each variable
+        covering = dict()
+        for variable in self.variables:
+            for k, cell in enumerate(variable.cells):
+                covering.setdefault(cell, []).append((variable, k))
+
         # Compute overlaps for each word
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        self.overlaps = Overlaps()
+        for variables in covering.values():
+            for v1, i in variables:
+                for v2, j in variables:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (i, j)
+
+        # Overlapping variables of each variable
+        adjacency = {variable: set() for variable in self.variables}
+        for v1, v2 in self.overlaps:
+            adjacency[v1].add(v2)
+        self.adjacency = types.MappingProxyType({
+            variable: frozenset(adjacent)
+            for variable, adjacent in adjacency.items()
+        })
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self.adjacency[var]
@@ -1,3 +1,4 @@
+import collections
 import sys
 
 from crossword import *
@@ -10,11 +11,69 @@ class CrosswordCreator():
         Create new CSP crossword generate.
         """
         self.crossword = crossword
+
+        # Words of each length, numbered from 0 within their length
+        self.words = dict()
+        for word in sorted(self.crossword.words):
+            self.words.setdefault(len(word), []).append(word)
+        self.ids = {
+            word: k
+            for words in self.words.values()
+            for k, word in enumerate(words)
+        }
+
+        # Domains are bitsets over the words of their variable's length:
+        # bit k is set if the domain contains `self.words[length][k]`
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.all_words(var.length)
             for var in self.crossword.variables
         }
 
+        # Bitset of the words of each length with a given letter at a
+        # given position, keyed by (length, position, letter)
+        self.index = dict()
+        for length, words in self.words.items():
+            backwards = "".join(reversed(words))
+            for position in range(length):
+
+                # Binary digits of each bitset are read off the letters at
+                # this position, last word first
+                column = backwards[position::length]
+                zeros = {ord(letter): "0" for letter in set(column)}
+                for letter in set(column):
+                    digits = column.translate({**zeros, ord(letter): "1"})
+                    self.index[length, position, letter] = int(digits, 2)
+        self.alphabet = sorted({letter for _, _, letter in self.index})
+
+        # Work done enforcing arc consistency
+        self.arcs_processed = 0
+        self.values_pruned = 0
+
+    def all_words(self, length):
+        """
+        Return the bitset of every word of the given length.
+        """
+        return (1 << len(self.words.get(length, []))) - 1
+
+    def domain_words(self, var):
+        """
+        Return the list of words in the domain of `var`, in word id order.
+        """
+        # Reversed binary digits, so that digit k is the bit of word k
+        digits = bin(self.domains[var])[:1:-1]
+        words = []
+        k = digits.find("1")
+        while k != -1:
+            words.append(self.words[var.length][k])
+            k = digits.find("1", k + 1)
+        return words
+
+    def domain_size(self, var):
+        """
+        Return the number of words in the domain of `var`.
+        """
+        return bin(self.domains[var]).count("1")
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -99,15 +158,10 @@ class CrosswordCreator():
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
-        # For each domain
+        # Keep only the words of the right length in each domain; domains
+        # are numbered by length, so this only drops out of range bits
         for domain in self.domains.keys():
-            words_to_remove = set()
-
-            for word in self.domains[domain]:
-                if len(word) != domain.length:
-                    words_to_remove.add(word)
-            # Updating the domain if there is any word to remove
-            self.domains[domain] -= words_to_remove
+            self.domains[domain] &= self.all_words(domain.length)
 
     def revise(self, x, y):
         """
@@ -118,29 +172,25 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        revised = False
-        words_to_remove = set()
         overlap_x_y = self.crossword.overlaps[x, y]
 
         if overlap_x_y is None:
             return False
 
+        # Words of x are supported by a letter that some word of y has
+        # at the overlap
         i, j = overlap_x_y
-        for first_word in self.domains[x]:
-            for second_word in self.domains[y]:
-                if first_word[i] == second_word[j]:
-                    break
-            else:
-                # if ith and jth letters are not the same, we'll remove the word (value)
-                # from the variable (domain) x in order to make it consistent with the variable (domain) Y
-                words_to_remove.add(first_word)
-                revised = True
-        
-        # Updating the variable x by removing the words or which there is no possible corresponding value for `y`
-        if words_to_remove:
-            self.domains[x] -= words_to_remove
+        supported = 0
+        for letter in self.alphabet:
+            if self.domains[y] & self.index.get((y.length, j, letter), 0):
+                supported |= self.index.get((x.length, i, letter), 0)
 
-        return revised
+        domain = self.domains[x] & supported
+        if domain == self.domains[x]:
+            return False
+        self.values_pruned += self.domain_size(x) - bin(domain).count("1")
+        self.domains[x] = domain
+        return True
 
     def ac3(self, arcs=None):
         """
@@ -151,36 +201,38 @@ class CrosswordCreator():
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
-        if arcs is not None:
-            queue = [arc for arc in arcs]
+        # Only overlapping variables constrain each other
+        if arcs is None:
+            arcs = [
+                arc for arc, overlap in self.crossword.overlaps.items()
+                if overlap is not None
+            ]
+
+        # First in, first out, with each arc queued at most once
+        queue = collections.deque()
+        queued = set()
+        for arc in arcs:
+            if arc not in queued:
+                queue.append(arc)
+                queued.add(arc)
 
-        else:
-            queue = []
-            for x in self.domains.keys():
-                for y in self.domains.keys():
-                    if x != y:
-                        queue.append((x, y))
-        
         while queue:
-            (X, Y) = self.Dequeue(queue)
-
-            if (X, Y) is not None:
-                if self.revise(X, Y):
-                    if len(self.domains[X]) == 0:
-                        return False
-                    
-                    for Z in self.crossword.neighbors(X):
+            X, Y = queue.popleft()
+            queued.discard((X, Y))
+            self.arcs_processed += 1
+
+            if self.revise(X, Y):
+                if not self.domains[X]:
+                    return False
+
+                # The words removed from X matched nothing in Y, so Y
+                # need not be revised against X again
+                for Z in self.crossword.neighbors(X):
+                    if Z != Y and (Z, X) not in queued:
                         queue.append((Z, X))
+                        queued.add((Z, X))
         return True
 
-    def Dequeue(self, queue):
-        """
-        This function remove x, y from the queue and return x, y so we can revise it in our ac3 function
-        """
-        for x, y in queue:
-            queue.remove((x, y))
-            return (x, y)
-
     def assignment_complete(self, assignment):
         """
         Return True if `assignment` is complete (i.e., assigns a value to each
@@ -235,13 +287,14 @@ class CrosswordCreator():
         word_count = {}
 
         neighbors = self.crossword.neighbors(var)
-        words = self.domains[var]
+        words = self.domain_words(var)
 
         for word in words:
             word_count[word] = 0
             if word not in assignment:
+                bit = 1 << self.ids[word]
                 for neighbor in neighbors:
-                    if word in self.domains[neighbor]:
+                    if neighbor.length == var.length and self.domains[neighbor] & bit:
                         word_count[word] += 1
         # Sorting the keys by the value in an ascendind order -> returning a sorted list
         sorted_list = sorted(word_count, key=lambda key: word_count[key])
@@ -263,9 +316,7 @@ class CrosswordCreator():
         domain_nb_values = {}
         
         for variable in unassigned_variables:
-            domain_nb_values[variable] = 0
-            if len(self.domains[variable]) > 0:
-                domain_nb_values[variable] = len(self.domains[variable])
+            domain_nb_values[variable] = self.domain_size(variable)
         
         return min(unassigned_variables, key=lambda key: (domain_nb_values[key], len(self.crossword.neighbors(key))))
         
@@ -0,0 +1,121 @@
+import contextlib
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from heredity import METHODS, load_data, sampled_probabilities
+
+FIELDS = ["file", "person", "gene_2", "gene_1", "gene_0",
+          "trait_true", "trait_false", "seconds"]
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python batch.py (directory | -) (output.jsonl | output.csv | -) [method]")
+    method = sys.argv[3] if len(sys.argv) == 4 else "junction"
+    if method not in METHODS:
+        sys.exit(f"Unknown method {method}, expected one of: {', '.join(METHODS)}")
+
+    # Families come from a directory, or as file names on standard input
+    if sys.argv[1] == "-":
+        files = (line.strip() for line in sys.stdin if line.strip())
+    else:
+        files = (
+            os.path.join(sys.argv[1], filename)
+            for filename in sorted(os.listdir(sys.argv[1]))
+            if filename.endswith(".csv")
+        )
+
+    output = sys.argv[2]
+    if output == "-":
+        destination = contextlib.nullcontext(sys.stdout)
+    else:
+        destination = open(output, "w", newline="")
+    with destination as f:
+        write = csv_writer(f) if output.endswith(".csv") else json_writer(f)
+        count, seconds = 0, 0
+        for result in process_families(files, method):
+            write(result)
+            count += 1
+            seconds += result["seconds"]
+    print(f"Processed {count} families in {seconds:.2f}s of worker time",
+          file=sys.stderr)
+
+
+def process_families(files, method, processes=None):
+    """
+    Compute the gene and trait distributions of every family CSV file in
+    `files` with `method`, spreading files over `processes` workers.
+
+    Yield, in order of completion, a dictionary for each file with its
+    name, the time spent on it in seconds, and either the `probabilities`
+    of its people or the `error` that stopped it from being processed.
+    """
+    jobs = ((filename, method) for filename in files)
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(process_family, jobs, chunksize=8)
+
+
+def process_family(job):
+    """
+    Load and process a single family CSV file; see `process_families`.
+    """
+    filename, method = job
+    start = time.perf_counter()
+    try:
+        people = load_data(filename)
+
+        # Workers cannot start pools of their own, so sample in-process
+        if method in ["likelihood", "gibbs"]:
+            probabilities = sampled_probabilities(people, method, processes=1)
+        else:
+            probabilities = METHODS[method](people)
+        result = {"file": filename, "probabilities": probabilities}
+    except (OSError, KeyError, ValueError, csv.Error) as e:
+        result = {"file": filename, "error": f"{type(e).__name__}: {e}"}
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def json_writer(f):
+    """
+    Return a function writing each result to `f` as a line of JSON.
+    """
+    def write(result):
+        f.write(json.dumps(result) + "\n")
+    return write
+
+
+def csv_writer(f):
+    """
+    Return a function writing each result to `f` as CSV rows, one per person.
+    Files that could not be processed are skipped and reported.
+    """
+    writer = csv.DictWriter(f, fieldnames=FIELDS)
+    writer.writeheader()
+
+    def write(result):
+        if "error" in result:
+            print(f"{result['file']}: {result['error']}", file=sys.stderr)
+            return
+        for person, distributions in result["probabilities"].items():
+            writer.writerow({
+                "file": result["file"],
+                "person": person,
+                "gene_2": distributions["gene"][2],
+                "gene_1": distributions["gene"][1],
+                "gene_0": distributions["gene"][0],
+                "trait_true": distributions["trait"][True],
+                "trait_false": distributions["trait"][False],
+                "seconds": f"{result['seconds']:.6f}"
+            })
+    return write
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 import csv
 import itertools
+import multiprocessing
+import random
 import sys
 import numpy as np
 
+from inference import JunctionTree, probability_tables
+from model import Model
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -37,15 +42,61 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Number of assignments evaluated together by the vectorized method
+BLOCK_SIZE = 65536
+
+# Sampling: independent chains, samples drawn per chain between checks,
+# Gibbs sweeps discarded at the start of each chain, and the requested
+# accuracy (half-width of a 95% interval) of every estimated probability
+CHAINS = 4
+ROUND_SAMPLES = 2000
+BURN_IN = 200
+ACCURACY = 0.01
+MAX_SAMPLES = 1000000
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python heredity.py data.csv [method] [model.json]")
+    method = sys.argv[2] if len(sys.argv) >= 3 else "junction"
+    if method not in METHODS:
+        sys.exit(f"Unknown method {method}, expected one of: {', '.join(METHODS)}")
     people = load_data(sys.argv[1])
 
+    # Probabilities in the model file replace those of PROBS
+    model = None
+    if len(sys.argv) == 4:
+        try:
+            model = Model.from_file(sys.argv[3], Model(PROBS))
+        except ValueError as e:
+            sys.exit(f"Invalid model: {e}")
+
     # Keep track of gene and trait probabilities for each person
+    probabilities = METHODS[method](people, model=model)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people, model=None):
+    """
+    Compute the gene and trait distributions of everyone in `people`
+    by enumerating every possible assignment of genes.
+    Probabilities come from `model` if given, or from `PROBS` otherwise.
+
+    Unknown traits are not enumerated: a trait only depends on its
+    person's own gene copies, so summing over it adds that person's
+    trait probabilities to their trait distribution and leaves the
+    joint probability unchanged.
+    """
     probabilities = {
         person: {
             "gene": {
@@ -61,39 +112,399 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
+    # Known traits have probability 1; unknown ones follow the genes
+    probs = model.probs if model is not None else PROBS
+    trait_shares = {
+        person: [
+            probs["trait"][gene_copies] if people[person]["trait"] is None
+            else {people[person]["trait"]: 1}
+            for gene_copies in range(3)
+        ]
+        for person in people
+    }
 
-    for have_trait in powerset(names):
+    for genes, p in gene_assignments(people, model):
+        for person, gene_copies in genes.items():
+            probabilities[person]["gene"][gene_copies] += p
+            for trait, share in trait_shares[person][gene_copies].items():
+                probabilities[person]["trait"][trait] += p * share
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+def gene_assignments(people, model=None):
+    """
+    Generate every assignment of gene copies to `people` that has a
+    non-zero probability given the known traits.
+
+    Yield (genes, p) pairs, where `genes` maps each person to their gene
+    copies and `p` is the probability of the assignment together with
+    the known traits. The dictionary yielded is reused, so it should not
+    be kept between iterations. Probabilities come from `model` if given,
+    or from `PROBS` otherwise.
+    """
+    order = parents_first(people)
+    factors = person_factors(people, model)
+    genes = dict()
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+    def assign(k, p):
+        """Assign gene copies to everyone from the `k`th person on."""
+        if k == len(order):
+            yield genes, p
+            return
 
-    # Print results
+        # Parents come first, so their gene copies are already known
+        person = order[k]
+        parents = (genes.get(people[person]["mother"]),
+                   genes.get(people[person]["father"]))
+        for gene_copies in range(3):
+            q = p * factors[person][(gene_copies,) + parents]
+
+            # Every assignment extending a zero-probability one is skipped
+            if q > 0:
+                genes[person] = gene_copies
+                yield from assign(k + 1, q)
+        genes.pop(person, None)
+
+    yield from assign(0, 1)
+
+
+def person_factors(people, model=None):
+    """
+    Return, for each person, a dictionary mapping their local assignment
+    (gene copies, mother's copies, father's copies) to the probability of
+    their gene copies given their parents' and of their known trait.
+    People without parents in the data have parent copies of None.
+    """
+    tables = model.tables if model is not None else probability_tables(PROBS)
+    prior, inheritance, trait = tables
+    factors = dict()
     for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+        has_trait = people[person]["trait"]
+        evidence = np.ones(3) if has_trait is None else trait[:, int(has_trait)]
+        if people[person]["mother"] is None or people[person]["father"] is None:
+            factors[person] = {
+                (gene_copies, None, None): float(prior[gene_copies] * evidence[gene_copies])
+                for gene_copies in range(3)
+            }
+        else:
+            factors[person] = {
+                (gene_copies, mother_copies, father_copies):
+                    float(inheritance[mother_copies, father_copies, gene_copies] * evidence[gene_copies])
+                for mother_copies, father_copies, gene_copies
+                in itertools.product(range(3), repeat=3)
+            }
+    return factors
+
+
+def parents_first(people):
+    """
+    Return the names in `people` ordered so that everyone comes after
+    their parents.
+    """
+    order = []
+    placed = set()
+
+    def place(person):
+        if person in placed:
+            return
+        placed.add(person)
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent is not None:
+                place(parent)
+        order.append(person)
+
+    for person in people:
+        place(person)
+    return order
+
+
+def vectorized_probabilities(people, block_size=BLOCK_SIZE, model=None):
+    """
+    Compute the gene and trait distributions of everyone in `people`
+    by enumerating every assignment of genes and of unknown traits,
+    evaluating the joint probabilities of `block_size` assignments at once.
+    Probabilities come from `model` if given, or from `PROBS` otherwise.
+    """
+    names = list(people)
+    tables = model.tables if model is not None else probability_tables(PROBS)
+
+    # Known traits are fixed; unknown traits are enumerated with the genes
+    known = np.array([people[name]["trait"] is not None for name in names])
+    unknown = np.flatnonzero(~known)
+    observed = np.array([bool(people[name]["trait"]) for name in names])
+
+    # Each assignment is a number written with one base-3 digit per
+    # person's gene count, then one base-2 digit per unknown trait
+    radices = np.array([3] * len(names) + [2] * len(unknown), dtype=np.int64)
+    places = np.concatenate([[1], np.cumprod(radices)[:-1]])
+    total = int(np.prod(radices))
+
+    gene_totals = np.zeros((3, len(names)))
+    trait_totals = np.zeros((2, len(names)))
+    for start in range(0, total, block_size):
+        codes = np.arange(start, min(start + block_size, total), dtype=np.int64)
+        digits = codes[:, None] // places % radices
+        genes = digits[:, :len(names)]
+        traits = np.tile(observed, (len(codes), 1))
+        traits[:, unknown] = digits[:, len(names):]
+
+        p = joint_probabilities(people, genes, traits, tables)
+        for copies in range(3):
+            gene_totals[copies] += p @ (genes == copies)
+        trait_totals[0] += p @ ~traits
+        trait_totals[1] += p @ traits
+
+    # Normalize by the total probability of the evidence
+    evidence = gene_totals.sum(axis=0)
+    return {
+        name: {
+            "gene": {g: gene_totals[g, i] / evidence[i] for g in (2, 1, 0)},
+            "trait": {
+                True: trait_totals[1, i] / evidence[i],
+                False: trait_totals[0, i] / evidence[i]
+            }
+        }
+        for i, name in enumerate(names)
+    }
+
+
+def junction_probabilities(people, model=None):
+    """
+    Compute the gene and trait distributions of everyone in `people`
+    exactly, by passing messages over a junction tree of the family,
+    which takes time linear in the size of tree-shaped families.
+    Probabilities come from `model` if given, or from `PROBS` otherwise.
+    """
+    tree = JunctionTree(people)
+    tables = model.tables if model is not None else probability_tables(PROBS)
+    return tree.marginals(people, *tables)
+
+
+def likelihood_weighting_probabilities(people, model=None):
+    """
+    Estimate the gene and trait distributions of everyone in `people`
+    with likelihood weighting: genes are sampled parents-first, and each
+    sample is weighted by the probability of the known traits.
+    Probabilities come from `model` if given, or from `PROBS` otherwise.
+    """
+    return sampled_probabilities(people, "likelihood", model=model)
+
+
+def gibbs_probabilities(people, model=None):
+    """
+    Estimate the gene and trait distributions of everyone in `people`
+    with Gibbs sampling, repeatedly resampling each person's gene copies
+    given those of their parents, children and children's other parents.
+    Probabilities come from `model` if given, or from `PROBS` otherwise.
+    """
+    return sampled_probabilities(people, "gibbs", model=model)
+
+
+def sampled_probabilities(people, method, chains=CHAINS, accuracy=ACCURACY,
+                          max_samples=MAX_SAMPLES, processes=None, seed=None,
+                          model=None):
+    """
+    Estimate the gene and trait distributions of everyone in `people`
+    by running `chains` sampling chains of `method` ("likelihood" or
+    "gibbs") in parallel across `processes` worker processes.
+
+    Chains draw ROUND_SAMPLES samples at a time. Sampling stops once every
+    estimated probability is known to within `accuracy` (with 95%
+    confidence) and the chains agree (Gelman-Rubin R-hat below 1.1),
+    or once each chain has drawn `max_samples` samples.
+    Probabilities come from `model` if given, or from `PROBS` otherwise.
+    """
+    names = list(people)
+    probs = model.probs if model is not None else PROBS
+    seeds = random.Random(seed)
+    states = [None] * chains
+    totals = []
+    weights = []
+
+    pool = None
+    if processes != 1 and chains > 1:
+        pool = multiprocessing.Pool(min(chains, processes or chains))
+    try:
+        drawn = 0
+        while drawn < max_samples:
+            jobs = [
+                (method, people, probs, states[chain], seeds.getrandbits(64), ROUND_SAMPLES)
+                for chain in range(chains)
+            ]
+            results = pool.map(sample_chain, jobs) if pool else list(map(sample_chain, jobs))
+            states = [state for state, _, _ in results]
+            totals.append([total for _, total, _ in results])
+            weights.append([weight for _, _, weight in results])
+            drawn += ROUND_SAMPLES
+
+            if len(totals) >= 2:
+                half_width, r_hat = convergence(np.array(totals), np.array(weights))
+                if half_width <= accuracy and r_hat < 1.1:
+                    break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # Pool the samples of every batch of every chain into one weighted average
+    estimates = np.sum(totals, axis=(0, 1)) / np.sum(weights)
+    return {
+        name: {
+            "gene": {g: float(estimates[i, g]) for g in (2, 1, 0)},
+            "trait": {True: float(estimates[i, 3]), False: 1 - float(estimates[i, 3])}
+        }
+        for i, name in enumerate(names)
+    }
+
+
+def convergence(totals, weights):
+    """
+    Given an array of weighted sample totals indexed by batch, chain and
+    then the estimated quantities, and an array of the total sample weight
+    of each batch of each chain, return the largest half-width of a 95%
+    interval around any pooled estimate (total over total weight), and
+    the largest Gelman-Rubin R-hat.
+
+    A pooled estimate is a ratio, so its variance comes from the delta
+    method: each batch contributes its totals minus its weight times the
+    estimate, scaled to the average batch weight.
+    """
+    rounds, chains = weights.shape
+    totals = totals.reshape(rounds, chains, -1)
+    estimates = totals.sum(axis=(0, 1)) / weights.sum()
+    batches = (totals - weights[:, :, None] * estimates) / weights.mean()
+    flat = batches.reshape(rounds * chains, -1)
+    half_width = 1.96 * flat.std(axis=0, ddof=1) / np.sqrt(rounds * chains)
+
+    # Compare the spread between chains to the spread within them
+    chain_means = batches.mean(axis=0)
+    within = batches.var(axis=0, ddof=1).mean(axis=0)
+    between = rounds * chain_means.var(axis=0, ddof=1) if chains > 1 else 0
+    pooled = (rounds - 1) / rounds * within + between / rounds
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_hat = np.sqrt(np.where(within > 0, pooled / within, 1))
+    return float(half_width.max()), float(r_hat.max())
+
+
+def sample_chain(job):
+    """
+    Draw samples for one chain. `job` holds the sampling method, the
+    people, the dictionary of probabilities to use, the chain state
+    returned by the previous call (or None), a random seed and the
+    number of samples to draw.
+
+    Return the new chain state, an array with, for each person, the
+    weighted totals of samples with 0, 1 and 2 gene copies and of the
+    probability of the trait, and the total weight of the samples.
+    """
+    method, people, probs, state, seed, samples = job
+    generator = random.Random(seed)
+    names = list(people)
+    totals = np.zeros((len(names), 4))
+    weights = 0
+
+    if method == "likelihood":
+        order = parents_first(people)
+        for _ in range(samples):
+            one_gene, two_genes, weight = weighted_sample(people, order, generator, probs)
+            add_sample(totals, people, names, one_gene, two_genes, weight, probs)
+            weights += weight
+        return None, totals, weights
+
+    # Gibbs chains start from a weighted sample and are burned in once
+    children = {person: [] for person in people}
+    for person in people:
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent is not None:
+                children[parent].append(person)
+    if state is None:
+        one_gene, two_genes, _ = weighted_sample(people, parents_first(people), generator, probs)
+        for _ in range(BURN_IN):
+            gibbs_sweep(people, children, one_gene, two_genes, generator, probs)
+    else:
+        one_gene, two_genes = state
+
+    for _ in range(samples):
+        gibbs_sweep(people, children, one_gene, two_genes, generator, probs)
+        add_sample(totals, people, names, one_gene, two_genes, 1, probs)
+    return (one_gene, two_genes), totals, samples
+
+
+def weighted_sample(people, order, generator, probs=PROBS):
+    """
+    Sample gene copies for everyone, parents first, and return the sets
+    of people with one and two copies and the probability of the known
+    traits given those genes.
+    """
+    one_gene = set()
+    two_genes = set()
+    weight = 1
+    for person in order:
+        chances = [
+            gene_probability(people, person, gene_copies, one_gene, two_genes, probs)
+            for gene_copies in range(3)
+        ]
+        gene_copies = generator.choices(range(3), chances)[0]
+        if gene_copies == 1:
+            one_gene.add(person)
+        elif gene_copies == 2:
+            two_genes.add(person)
+
+        has_trait = people[person]["trait"]
+        if has_trait is not None:
+            weight *= probs["trait"][gene_copies][has_trait]
+    return one_gene, two_genes, weight
+
+
+def gibbs_sweep(people, children, one_gene, two_genes, generator, probs=PROBS):
+    """
+    Resample, in place, the gene copies of each person in turn from their
+    distribution given everyone else's gene copies and the known traits.
+    """
+    for person in people:
+        one_gene.discard(person)
+        two_genes.discard(person)
+        has_trait = people[person]["trait"]
+
+        chances = []
+        for gene_copies, genes in [(0, None), (1, one_gene), (2, two_genes)]:
+            if genes is not None:
+                genes.add(person)
+            chance = gene_probability(people, person, gene_copies, one_gene, two_genes, probs)
+            if has_trait is not None:
+                chance *= probs["trait"][gene_copies][has_trait]
+            for child in children[person]:
+                child_copies = 1 if child in one_gene else 2 if child in two_genes else 0
+                chance *= gene_probability(people, child, child_copies, one_gene, two_genes, probs)
+            chances.append(chance)
+            if genes is not None:
+                genes.remove(person)
+
+        gene_copies = generator.choices(range(3), chances)[0]
+        if gene_copies == 1:
+            one_gene.add(person)
+        elif gene_copies == 2:
+            two_genes.add(person)
+
+
+def add_sample(totals, people, names, one_gene, two_genes, weight, probs=PROBS):
+    """
+    Add a sample with the given `weight` to the running `totals` of gene
+    copies and trait probabilities of each person.
+    """
+    for i, person in enumerate(names):
+        gene_copies = 1 if person in one_gene else 2 if person in two_genes else 0
+        totals[i, gene_copies] += weight
+
+        # Unknown traits contribute their probability given the genes
+        has_trait = people[person]["trait"]
+        if has_trait is None:
+            totals[i, 3] += weight * probs["trait"][gene_copies][True]
+        else:
+            totals[i, 3] += weight * has_trait
 
 
 def load_data(filename):
@@ -154,33 +565,7 @@ def joint_probability(people, one_gene, two_genes, have_trait):
 
         person_trait_probability = PROBS['trait'][gene_copies][has_trait]
 
-        mother = people[person]['mother']
-        father = people[person]['father']
-
-        # If person has no parents -> basic probability based on the Probs dict.
-        if mother is None or father is None:
-            person_gene_probability = PROBS['gene'][gene_copies]
-
-        # If person has parents -> probability based on the probability of parents giving gene
-        else:
-            mother_gene_probality = probability_from_parent(mother, one_gene, two_genes)
-            father_gene_probality = probability_from_parent(father, one_gene, two_genes)
-
-            if gene_copies == 0:
-                # Probability of each parent not having the gene
-                person_gene_probability = (1 - mother_gene_probality) * (1 - father_gene_probality)
-            
-            elif gene_copies == 1:
-                # Chance of child having gene from mother but not father and vice versa
-                chance_from_mother_not_father = mother_gene_probality * (1 - father_gene_probality)
-                chance_from_father_not_mother = father_gene_probality * (1 - mother_gene_probality)
-
-                # Probability of child having gene from parents
-                person_gene_probability = chance_from_mother_not_father + chance_from_father_not_mother
-            
-            else:
-                # Probability of each parent having the gene
-                person_gene_probability = mother_gene_probality * father_gene_probality
+        person_gene_probability = gene_probability(people, person, gene_copies, one_gene, two_genes)
         
         chance_HasGeneAndtraitDisplay = person_gene_probability * person_trait_probability
 
@@ -191,7 +576,78 @@ def joint_probability(people, one_gene, two_genes, have_trait):
     return joint_probability
 
 
-def probability_from_parent(parent, one_gene, two_genes):
+def gene_probability(people, person, gene_copies, one_gene, two_genes, probs=PROBS):
+    """
+    Compute the probability that `person` has `gene_copies` copies of the
+    gene, given the gene copies of their parents in `one_gene` and `two_genes`,
+    using the dictionary of probabilities `probs`.
+    """
+    mother = people[person]['mother']
+    father = people[person]['father']
+
+    # If person has no parents -> basic probability based on the Probs dict.
+    if mother is None or father is None:
+        return probs['gene'][gene_copies]
+
+    # If person has parents -> probability based on the probability of parents giving gene
+    mother_gene_probality = probability_from_parent(mother, one_gene, two_genes, probs)
+    father_gene_probality = probability_from_parent(father, one_gene, two_genes, probs)
+
+    if gene_copies == 0:
+        # Probability of each parent not having the gene
+        return (1 - mother_gene_probality) * (1 - father_gene_probality)
+
+    elif gene_copies == 1:
+        # Chance of child having gene from mother but not father and vice versa
+        chance_from_mother_not_father = mother_gene_probality * (1 - father_gene_probality)
+        chance_from_father_not_mother = father_gene_probality * (1 - mother_gene_probality)
+
+        # Probability of child having gene from parents
+        return chance_from_mother_not_father + chance_from_father_not_mother
+
+    else:
+        # Probability of each parent having the gene
+        return mother_gene_probality * father_gene_probality
+
+
+def joint_probabilities(people, genes, traits, tables):
+    """
+    Compute the joint probabilities of a block of assignments at once.
+
+    `genes` is an integer array with one row per assignment and one
+    column per person in `people` (in order), giving their gene count;
+    `traits` is a boolean array of the same shape saying who has the
+    trait. `tables` are the arrays returned by `probability_tables`.
+    Return an array with the joint probability of each assignment.
+    """
+    prior, inheritance, trait = tables
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+
+    # People without parents take their own column as a placeholder
+    has_parents = np.array([
+        people[name]["mother"] is not None and people[name]["father"] is not None
+        for name in names
+    ])
+    mothers = np.array([
+        index[people[name]["mother"]] if has_parents[i] else i
+        for i, name in enumerate(names)
+    ], dtype=np.int64)
+    fathers = np.array([
+        index[people[name]["father"]] if has_parents[i] else i
+        for i, name in enumerate(names)
+    ], dtype=np.int64)
+
+    gene_probabilities = np.where(
+        has_parents,
+        inheritance[genes[:, mothers], genes[:, fathers], genes],
+        prior[genes]
+    )
+    trait_probabilities = trait[genes, traits.astype(np.int64)]
+    return (gene_probabilities * trait_probabilities).prod(axis=1)
+
+
+def probability_from_parent(parent, one_gene, two_genes, probs=PROBS):
     """
     This function computes the probability that a parent give the gene to the child 
     depending on the number of gene copies that parent has
@@ -202,9 +658,9 @@ def probability_from_parent(parent, one_gene, two_genes):
     if parent in one_gene:
         return 0.5
     elif parent in two_genes:
-        return 1 - PROBS["mutation"]
+        return 1 - probs["mutation"]
     else:
-        return PROBS['mutation']
+        return probs['mutation']
 
             
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -241,7 +697,16 @@ def normalize(probabilities):
 
         probabilities[person]['trait'] = {trait: (its_probability / sum(probability_trait_values))                                       
                                           for trait, its_probability in probabilities[person]['trait'].items()}
-    
+
+
+METHODS = {
+    "junction": junction_probabilities,
+    "enumerate": enumerate_probabilities,
+    "vectorized": vectorized_probabilities,
+    "likelihood": likelihood_weighting_probabilities,
+    "gibbs": gibbs_probabilities
+}
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,227 @@
+import heapq
+
+import numpy as np
+
+
+def probability_tables(probs):
+    """
+    Compile a dictionary of probabilities shaped like `PROBS` into arrays:
+
+        * `prior[g]`, the probability of having g copies of the gene
+          for a person without parents in the data;
+        * `inheritance[m, f, g]`, the probability of a child having g
+          copies of the gene given m copies in the mother and f in the father;
+        * `trait[g, t]`, the probability of showing the trait (t = 1)
+          or not (t = 0) given g copies of the gene.
+    """
+    prior = np.array([probs["gene"][g] for g in range(3)])
+    trait = np.array([
+        [probs["trait"][g][False], probs["trait"][g][True]] for g in range(3)
+    ])
+
+    # Probability of a parent with 0, 1 or 2 copies passing the gene on
+    mutation = probs["mutation"]
+    passes = np.array([mutation, 0.5, 1 - mutation])
+    mother = passes[:, None]
+    father = passes[None, :]
+    inheritance = np.stack([
+        (1 - mother) * (1 - father),
+        mother * (1 - father) + father * (1 - mother),
+        mother * father
+    ], axis=-1)
+
+    return prior, inheritance, trait
+
+
+class JunctionTree():
+
+    def __init__(self, people):
+        """
+        Build a junction tree over the gene variables of everyone in
+        `people`, using only the family structure (who is whose parent).
+        """
+        self.names = list(people)
+        ids = {name: i for i, name in enumerate(self.names)}
+
+        # Each person's gene count depends on their parents' gene counts
+        self.scopes = []
+        for name in self.names:
+            mother = people[name]["mother"]
+            father = people[name]["father"]
+            if mother is None or father is None:
+                self.scopes.append((ids[name],))
+            else:
+                self.scopes.append((ids[mother], ids[father], ids[name]))
+
+        # Moral graph: connect variables sharing a factor
+        neighbors = [set() for _ in self.names]
+        for scope in self.scopes:
+            for v in scope:
+                neighbors[v].update(u for u in scope if u != v)
+
+        # Eliminate variables one at a time; each elimination creates a
+        # clique of the variable and its remaining neighbors
+        self.cliques = []
+        self.parents = []
+        clique_of = dict()
+        for v in elimination_order(neighbors):
+            clique_of[v] = len(self.cliques)
+            self.cliques.append((v,) + tuple(sorted(neighbors[v])))
+            for u in neighbors[v]:
+                neighbors[u].discard(v)
+                neighbors[u].update(w for w in neighbors[v] if w != u)
+
+        # A clique's parent is the clique of its first-eliminated neighbor
+        for clique in self.cliques:
+            rest = clique[1:]
+            self.parents.append(
+                min((clique_of[u] for u in rest), default=None)
+            )
+
+        # Each factor goes to the clique of its first-eliminated variable
+        self.home = [clique_of[v] for v in range(len(self.names))]
+        self.assigned = [[] for _ in self.cliques]
+        for person, scope in enumerate(self.scopes):
+            self.assigned[min(clique_of[v] for v in scope)].append(person)
+
+    def marginals(self, people, prior, inheritance, trait):
+        """
+        Return the gene and trait distributions of everyone in `people`,
+        given the trait evidence in `people` and the probability tables
+        returned by `probability_tables`, in the same form as the
+        `probabilities` dictionary of `main`.
+        """
+        # Evidence: how likely each gene count makes the observed trait
+        evidence = []
+        for name in self.names:
+            observed = people[name]["trait"]
+            evidence.append(
+                np.ones(3) if observed is None else trait[:, int(observed)]
+            )
+
+        potentials = []
+        for clique, persons in zip(self.cliques, self.assigned):
+            factors = []
+            for person in persons:
+                scope = self.scopes[person]
+                table = inheritance if len(scope) == 3 else prior
+                factors.append((scope, table * evidence[person]))
+            potentials.append(product(factors, clique))
+
+        # Collect messages from the leaves up to the roots
+        children = [[] for _ in self.cliques]
+        up = [None] * len(self.cliques)
+        for i, clique in enumerate(self.cliques):
+            if self.parents[i] is None:
+                continue
+            factors = [(clique, potentials[i])]
+            factors += [(self.cliques[c][1:], up[c]) for c in children[i]]
+            up[i] = normalized(product(factors, clique[1:]))
+            children[self.parents[i]].append(i)
+
+        # Distribute messages from the roots back down to the leaves
+        down = [None] * len(self.cliques)
+        for i in reversed(range(len(self.cliques))):
+            clique = self.cliques[i]
+            incoming = [(clique, potentials[i])]
+            if down[i] is not None:
+                incoming.append((clique[1:], down[i]))
+            for c in children[i]:
+                factors = incoming + [
+                    (self.cliques[other][1:], up[other])
+                    for other in children[i] if other != c
+                ]
+                down[c] = normalized(product(factors, self.cliques[c][1:]))
+
+        probabilities = dict()
+        for person, name in enumerate(self.names):
+            i = self.home[person]
+            clique = self.cliques[i]
+            factors = [(clique, potentials[i])]
+            if down[i] is not None:
+                factors.append((clique[1:], down[i]))
+            factors += [(self.cliques[c][1:], up[c]) for c in children[i]]
+            gene = normalized(product(factors, (person,)))
+
+            observed = people[name]["trait"]
+            if observed is None:
+                has_trait = float(gene @ trait[:, 1])
+            else:
+                has_trait = float(observed)
+
+            probabilities[name] = {
+                "gene": {g: float(gene[g]) for g in (2, 1, 0)},
+                "trait": {True: has_trait, False: 1 - has_trait}
+            }
+        return probabilities
+
+
+def elimination_order(neighbors):
+    """
+    Return an order in which to eliminate the variables of a graph,
+    given as a list of neighbor sets, greedily choosing the variable
+    whose elimination adds the fewest new edges (then the fewest
+    neighbors). The neighbor sets are not modified.
+    """
+    neighbors = [set(adjacent) for adjacent in neighbors]
+
+    def cost(v):
+        adjacent = list(neighbors[v])
+        fill = sum(
+            1 for a in range(len(adjacent)) for b in range(a)
+            if adjacent[b] not in neighbors[adjacent[a]]
+        )
+        return (fill, len(adjacent))
+
+    heap = [(cost(v), v) for v in range(len(neighbors))]
+    heapq.heapify(heap)
+    current = {v: score for score, v in heap}
+    order = []
+    eliminated = set()
+    while heap:
+        score, v = heapq.heappop(heap)
+
+        # Skip entries whose score has changed since they were pushed
+        if v in eliminated or score != current[v]:
+            continue
+        order.append(v)
+        eliminated.add(v)
+
+        for u in neighbors[v]:
+            neighbors[u].discard(v)
+            neighbors[u].update(w for w in neighbors[v] if w != u)
+        for u in neighbors[v]:
+            current[u] = cost(u)
+            heapq.heappush(heap, (current[u], u))
+    return order
+
+
+def product(factors, variables):
+    """
+    Multiply `factors`, a list of (variables, table) pairs, and sum out
+    every variable not in `variables`. Return the resulting table, with
+    one axis per variable in `variables`.
+    """
+    labels = dict()
+    operands = []
+    for scope, table in factors:
+        operands.append(table)
+        operands.append([labels.setdefault(v, len(labels)) for v in scope])
+    for v in variables:
+        labels.setdefault(v, len(labels))
+    if not factors:
+        return np.ones((3,) * len(variables))
+    output = [labels[v] for v in variables]
+
+    # Variables missing from every factor contribute a factor of one
+    missing = [v for v in variables if all(v not in s for s, _ in factors)]
+    for v in missing:
+        operands += [np.ones(3), [labels[v]]]
+    return np.einsum(*operands, output)
+
+
+def normalized(table):
+    """
+    Return `table` scaled to sum to 1.
+    """
+    return table / table.sum()
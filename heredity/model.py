@@ -0,0 +1,113 @@
+import copy
+import itertools
+import json
+
+from inference import JunctionTree, probability_tables
+
+
+class Model():
+
+    def __init__(self, probs):
+        """
+        Create a new model from a dictionary of probabilities shaped like
+        `PROBS`, compiling it into the arrays of `probability_tables`.
+        """
+        validate(probs)
+        self.probs = probs
+        self.prior, self.inheritance, self.trait = probability_tables(probs)
+
+    def __repr__(self):
+        return f"Model({self.probs})"
+
+    @property
+    def tables(self):
+        return self.prior, self.inheritance, self.trait
+
+    @classmethod
+    def from_file(cls, filename, base):
+        """
+        Load a model from a JSON file, starting from the probabilities of
+        the model `base` and replacing those given in the file. The file
+        may set any of:
+
+            "gene": {"2": p2, "1": p1, "0": p0}
+            "trait": {"2": p, "1": p, "0": p}
+            "mutation": p
+
+        where each trait value is the probability of showing the trait,
+        or a {"true": p, "false": q} pair.
+        """
+        with open(filename) as f:
+            return base.updated(json.load(f))
+
+    def updated(self, parameters):
+        """
+        Return a new model with the probabilities in `parameters` (in the
+        format read by `from_file`) replacing those of this model.
+        """
+        probs = copy.deepcopy(self.probs)
+        for name, value in parameters.items():
+            if name == "mutation":
+                probs["mutation"] = float(value)
+            elif name == "gene":
+                for gene_copies, p in value.items():
+                    probs["gene"][int(gene_copies)] = float(p)
+            elif name == "trait":
+                for gene_copies, p in value.items():
+                    probs["trait"][int(gene_copies)] = trait_distribution(p)
+            elif name.startswith("trait."):
+                probs["trait"][int(name[len("trait."):])] = trait_distribution(value)
+            else:
+                raise ValueError(f"unknown model parameter {name!r}")
+        return Model(probs)
+
+
+def trait_distribution(value):
+    """
+    Return a {True: p, False: q} distribution from either the probability
+    of showing the trait or a {"true": p, "false": q} dictionary.
+    """
+    if isinstance(value, dict):
+        return {True: float(value["true"]), False: float(value["false"])}
+    return {True: float(value), False: 1 - float(value)}
+
+
+def validate(probs):
+    """
+    Raise a ValueError unless every distribution in `probs` sums to 1
+    and every probability lies between 0 and 1.
+    """
+    distributions = [probs["gene"]] + [probs["trait"][g] for g in range(3)]
+    for distribution in distributions:
+        if any(not 0 <= p <= 1 for p in distribution.values()):
+            raise ValueError(f"probabilities must be between 0 and 1: {distribution}")
+        if abs(sum(distribution.values()) - 1) > 1e-9:
+            raise ValueError(f"probabilities must sum to 1: {distribution}")
+    if not 0 <= probs["mutation"] <= 1:
+        raise ValueError("mutation probability must be between 0 and 1")
+
+
+def settings(grid):
+    """
+    Generate every combination of parameter values in `grid`, which maps
+    parameter names (as read by `Model.from_file`, with "trait.G" for the
+    trait probability given G copies) to lists of values to try.
+    """
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def sweep(people, base, grid):
+    """
+    Compute the gene and trait distributions of everyone in `people`
+    under every combination of parameters in `grid` (see `settings`),
+    applied on top of the model `base`.
+
+    The junction tree of the family is built once and reused for every
+    combination. Yield (parameters, probabilities) pairs.
+    """
+    tree = JunctionTree(people)
+    for parameters in settings(grid):
+        model = base.updated(parameters)
+        yield parameters, tree.marginals(people, *model.tables)
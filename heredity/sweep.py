@@ -0,0 +1,31 @@
+import json
+import sys
+
+from heredity import PROBS, load_data
+from model import Model, sweep
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python sweep.py data.csv sweep.json [model.json]")
+    people = load_data(sys.argv[1])
+
+    # The sweep file maps parameter names to lists of values to try
+    with open(sys.argv[2]) as f:
+        grid = json.load(f)
+    try:
+        base = Model(PROBS)
+        if len(sys.argv) == 4:
+            base = Model.from_file(sys.argv[3], base)
+
+        # Print one line of JSON per combination of parameters
+        for parameters, probabilities in sweep(people, base, grid):
+            print(json.dumps({"parameters": parameters, "probabilities": probabilities}))
+    except ValueError as e:
+        sys.exit(f"Invalid model: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import random
+import sys
+import time
+import tracemalloc
+
+from logic import (And, Biconditional, Implication, Not, Or, Symbol,
+                   compiled_check, model_check, pruned_check, truth_table_check)
+from sat import sat_check
+
+SIZES = [2, 4, 6, 8, 10, 20, 50]
+STATEMENTS_PER_CHARACTER = 2
+
+# Backends enumerating every model are skipped above these symbol counts
+ENUMERATION_LIMITS = {
+    "model_check": 16,
+    "compiled": 22,
+    "truth-table": 24,
+    "pruned": 100
+}
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    print(f"{'backend':<12} {'characters':>10} {'symbols':>8} {'entailed':>8} "
+          f"{'visited':>10} {'seconds':>9} {'peak KB':>9}")
+    for characters in sizes:
+        knowledge, symbols = generate_puzzle(
+            characters, STATEMENTS_PER_CHARACTER * characters, seed=characters
+        )
+
+        # Is the first character a knight?
+        query = symbols[0]
+        for backend, check in BACKENDS.items():
+            if len(symbols) > ENUMERATION_LIMITS.get(backend, len(symbols)):
+                continue
+            entailed, stats, seconds, peak = benchmark(check, knowledge, query)
+
+            # The SAT backend counts search decisions rather than models
+            visited = stats.get("models", stats.get("decisions", 0))
+            print(f"{backend:<12} {characters:>10} {len(symbols):>8} "
+                  f"{str(entailed):>8} {visited:>10} {seconds:>9.3f} "
+                  f"{peak / 2 ** 10:>9.1f}")
+
+
+def generate_puzzle(characters, statements, seed=None):
+    """
+    Return a random knights and knaves puzzle with `characters` characters
+    making `statements` statements in total, as a knowledge base and the
+    list of its symbols: "X is a Knight" then "X is a Knave" for each
+    character X.
+
+    Statements are made up to be consistent with a hidden assignment of
+    roles, so the knowledge base always has at least one model.
+    """
+    rng = random.Random(seed)
+    names = [f"P{i}" for i in range(characters)]
+    knights = [Symbol(f"{name} is a Knight") for name in names]
+    knaves = [Symbol(f"{name} is a Knave") for name in names]
+    hidden = dict()
+    for knight, knave in zip(knights, knaves):
+        hidden[knight.name] = rng.random() < 0.5
+        hidden[knave.name] = not hidden[knight.name]
+
+    # Everyone is either a knight or a knave, but not both
+    knowledge = And()
+    for knight, knave in zip(knights, knaves):
+        knowledge.add(And(Or(knight, knave), Not(And(knight, knave))))
+
+    # Knights tell the truth and knaves lie
+    for _ in range(statements):
+        speaker = rng.randrange(characters)
+        claim = random_claim(rng, knights, knaves)
+        if claim.evaluate(hidden) != hidden[knights[speaker].name]:
+            claim = Not(claim)
+        knowledge.add(Biconditional(knights[speaker], claim))
+
+    symbols = [symbol for pair in zip(knights, knaves) for symbol in pair]
+    return knowledge, symbols
+
+
+def random_claim(rng, knights, knaves):
+    """
+    Return a random claim about one or two characters, such as "B is a
+    knave" or "if A is a knight then C is a knave".
+    """
+    def role():
+        i = rng.randrange(len(knights))
+        return knights[i] if rng.random() < 0.5 else knaves[i]
+
+    kind = rng.choice(["role", "not", "and", "or", "implication"])
+    if kind == "role":
+        return role()
+    elif kind == "not":
+        return Not(role())
+    elif kind == "and":
+        return And(role(), role())
+    elif kind == "or":
+        return Or(role(), role())
+    return Implication(role(), role())
+
+
+def benchmark(check, knowledge, query):
+    """
+    Check whether `knowledge` entails `query` with `check`, once to time
+    it and count the models it visits, and once under `tracemalloc` to
+    measure its peak memory use.
+    Return the answer, the statistics of the check, the time taken in
+    seconds and the peak memory in bytes.
+    """
+    stats = dict()
+    start = time.perf_counter()
+    entailed = check(knowledge, query, stats)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        check(knowledge, query, None)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return entailed, stats, seconds, peak
+
+
+BACKENDS = {
+    "model_check": model_check,
+    "pruned": pruned_check,
+    "compiled": compiled_check,
+    "truth-table": truth_table_check,
+    "sat": sat_check
+}
+
+
+if __name__ == "__main__":
+    main()
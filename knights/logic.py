@@ -1,19 +1,195 @@
 import itertools
+import weakref
+
+# Largest nesting depth and length of a compiled expression (see
+# `Sentence.expression`) before it is moved into a local variable
+NESTING_LIMIT = 50
+LENGTH_LIMIT = 1000
 
 
 class Sentence():
 
+    __slots__ = ("_hash", "_symbols", "_stale", "_parents", "__weakref__")
+
+    # Sentences that cannot change are shared: building an equal one
+    # returns the existing object (see `intern`)
+    interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, **parts):
+        """
+        Returns the sentence of this class made of `parts`, creating it
+        only if no such sentence exists. Sentence parts are compared by
+        identity, so that changing one in place cannot corrupt the table.
+        """
+        key = (cls,) + tuple(
+            id(part) if isinstance(part, Sentence) else part
+            for part in parts.values()
+        )
+        sentence = Sentence.interned.get(key)
+        if sentence is None:
+            sentence = super().__new__(cls)
+            for name, part in parts.items():
+                setattr(sentence, name, part)
+            sentence.link()
+            Sentence.interned[key] = sentence
+        return sentence
+
+    def __hash__(self):
+        if self._stale:
+            self.refresh()
+        return self._hash
+
+    def __reduce__(self):
+        # Copies and pickles are rebuilt from their parts, going through
+        # interning, rather than restoring cached hashes (which differ
+        # between processes)
+        return (type(self), tuple(self.children()))
+
+    def children(self):
+        """Returns the sentences the logical sentence is made of."""
+        return ()
+
+    def link(self, mutable=False):
+        """
+        Caches the hash and symbols of a new sentence, computed from those
+        of its children. Sentences that can change in place (`mutable`)
+        or that contain one are registered with their changeable children,
+        so that changing those marks them stale (see `invalidate`).
+        Other sentences never change, and have a `_stale` of None.
+        """
+        self._stale = False if mutable else None
+        self._parents = None
+        for child in self.children():
+            if self.watch(child):
+                child.refresh()
+                self._stale = False
+        self.summarize()
+
+    def watch(self, child):
+        """
+        Registers the sentence with `child` if `child` can change, so that
+        changing it marks the sentence stale. Returns whether it can.
+        """
+        if child._stale is None:
+            return False
+        # Keyed by identity, since the hash of a sentence can change
+        if child._parents is None:
+            child._parents = weakref.WeakValueDictionary()
+        child._parents[id(self)] = self
+        return True
+
+    def summarize(self):
+        """Computes the hash and symbols from those of the children."""
+        children = self.children()
+        self._hash = hash((
+            type(self).__name__, tuple(child._hash for child in children)
+        ))
+        self._symbols = frozenset().union(
+            *[child._symbols for child in children]
+        )
+
+    def invalidate(self):
+        """Marks the sentence and every sentence containing it as stale."""
+        stack = [self]
+        while stack:
+            sentence = stack.pop()
+
+            # Sentences containing a stale sentence are already stale
+            if not sentence._stale:
+                sentence._stale = True
+                if sentence._parents is not None:
+                    stack.extend(sentence._parents.values())
+
+    def refresh(self):
+        """
+        Recomputes the cached hash and symbols of a stale sentence, after
+        those of its stale children, using a stack rather than recursion.
+        """
+        stack = [self] if self._stale else []
+        while stack:
+            sentence = stack[-1]
+            stale = [child for child in sentence.children() if child._stale]
+            if stale:
+                stack.extend(stale)
+            else:
+                sentence.summarize()
+                sentence._stale = False
+                stack.pop()
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave symbols
+        unassigned. Returns True or False if the sentence has that value
+        however the missing symbols are assigned, or None otherwise.
+        """
+        raise Exception("nothing to evaluate")
+
+    def source(self, index, lines, names):
+        """
+        Returns a Python expression evaluating the logical sentence in a
+        model given as an integer `m`, where the symbol named `name` is
+        true if bit `index[name]` of `m` is set. The expression is truthy
+        if the sentence is true. Its operands are built by `expression`,
+        which may add assignments of local variables to `lines`.
+        """
+        raise Exception("nothing to compile")
+
+    def expression(self, index, lines, names):
+        """
+        Returns a parenthesized Python expression for the logical sentence
+        (see `source`). Expressions nested too deeply or too long to repeat
+        are assigned to a local variable in `lines` instead, and its name
+        is returned. `names` maps each sentence already compiled to its
+        expression and nesting depth.
+        """
+        # Children are compiled before their parents using a stack, so
+        # that `source` only looks their expressions up and never recurses
+        stack = [self]
+        while stack:
+            sentence = stack[-1]
+            pending = [
+                child for child in sentence.children() if child not in names
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            if sentence in names:
+                continue
+            text = f"({sentence.source(index, lines, names)})"
+            depth = 1 + max(
+                (names[child][1] for child in sentence.children()), default=0
+            )
+            if depth >= NESTING_LIMIT or len(text) > LENGTH_LIMIT:
+                local = f"t{len(lines)}"
+                lines.append(f"{local} = {text}")
+                text, depth = local, 0
+            names[sentence] = (text, depth)
+        return names[self][0]
+
+    def truth_table(self, columns, full):
+        """
+        Returns the truth table column of the logical sentence as an
+        integer whose bit m is set if the sentence is true in model m,
+        given the columns of its symbols and the column `full` of all
+        models.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        if self._stale:
+            self.refresh()
+        return self._symbols
 
     @classmethod
     def validate(cls, sentence):
@@ -44,14 +220,23 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        return cls.intern(name=name)
 
     def __eq__(self, other):
         return isinstance(other, Symbol) and self.name == other.name
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        return self._hash
+
+    def __reduce__(self):
+        return (type(self), (self.name,))
+
+    def summarize(self):
+        self._hash = hash(("symbol", self.name))
+        self._symbols = frozenset([self.name])
 
     def __repr__(self):
         return self.name
@@ -62,23 +247,44 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
+    def source(self, index, lines, names):
+        try:
+            return f"m & {1 << index[self.name]}"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def truth_table(self, columns, full):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
     def formula(self):
         return self.name
 
     def symbols(self):
-        return {self.name}
+        return self._symbols
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        return cls.intern(operand=operand)
 
     def __eq__(self, other):
         return isinstance(other, Not) and self.operand == other.operand
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    __hash__ = Sentence.__hash__
+
+    def children(self):
+        return (self.operand,)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +292,38 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def partial(self, model):
+        value = self.operand.partial(model)
+        return None if value is None else not value
+
+    def source(self, index, lines, names):
+        return f"not {self.operand.expression(index, lines, names)}"
+
+    def truth_table(self, columns, full):
+        return full ^ self.operand.truth_table(columns, full)
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
+
+    # Not interned, since `add` changes a conjunction in place
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self.link(mutable=True)
 
     def __eq__(self, other):
         return isinstance(other, And) and self.conjuncts == other.conjuncts
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    __hash__ = Sentence.__hash__
+
+    def children(self):
+        return self.conjuncts
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -116,33 +334,61 @@ class And(Sentence):
     def add(self, conjunct):
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
+        self.watch(conjunct)
+        self.invalidate()
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
+    def source(self, index, lines, names):
+        if not self.conjuncts:
+            return "True"
+        return " and ".join(
+            conjunct.expression(index, lines, names)
+            for conjunct in self.conjuncts
+        )
+
+    def truth_table(self, columns, full):
+        column = full
+        for conjunct in self.conjuncts:
+            column &= conjunct.truth_table(columns, full)
+        return column
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
+
+    # Not interned, like `And`
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
+        self.link(mutable=True)
 
     def __eq__(self, other):
         return isinstance(other, Or) and self.disjuncts == other.disjuncts
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    __hash__ = Sentence.__hash__
+
+    def children(self):
+        return self.disjuncts
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +397,55 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
+    def source(self, index, lines, names):
+        if not self.disjuncts:
+            return "False"
+        return " or ".join(
+            disjunct.expression(index, lines, names)
+            for disjunct in self.disjuncts
+        )
+
+    def truth_table(self, columns, full):
+        column = 0
+        for disjunct in self.disjuncts:
+            column |= disjunct.truth_table(columns, full)
+        return column
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        return cls.intern(antecedent=antecedent, consequent=consequent)
 
     def __eq__(self, other):
         return (isinstance(other, Implication)
                 and self.antecedent == other.antecedent
                 and self.consequent == other.consequent)
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    __hash__ = Sentence.__hash__
+
+    def children(self):
+        return (self.antecedent, self.consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +454,51 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def partial(self, model):
+        antecedent = self.antecedent.partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+
+    def source(self, index, lines, names):
+        antecedent = self.antecedent.expression(index, lines, names)
+        consequent = self.consequent.expression(index, lines, names)
+        return f"not {antecedent} or {consequent}"
+
+    def truth_table(self, columns, full):
+        antecedent = self.antecedent.truth_table(columns, full)
+        consequent = self.consequent.truth_table(columns, full)
+        return (full ^ antecedent) | consequent
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        return cls.intern(left=left, right=right)
 
     def __eq__(self, other):
         return (isinstance(other, Biconditional)
                 and self.left == other.left
                 and self.right == other.right)
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    __hash__ = Sentence.__hash__
+
+    def children(self):
+        return (self.left, self.right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,23 +509,44 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def partial(self, model):
+        left = self.left.partial(model)
+        if left is None:
+            return None
+        right = self.right.partial(model)
+        if right is None:
+            return None
+        return left == right
+
+    def source(self, index, lines, names):
+        # Symbols evaluate to their bit, so compare negations
+        left = self.left.expression(index, lines, names)
+        right = self.right.expression(index, lines, names)
+        return f"(not {left}) == (not {right})"
+
+    def truth_table(self, columns, full):
+        left = self.left.truth_table(columns, full)
+        right = self.right.truth_table(columns, full)
+        return full ^ left ^ right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+def model_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query.
+    If `stats` is a dictionary, the number of models checked is added to it.
+    """
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
 
         # If model has an assignment for each symbol
         if not symbols:
+            tally(stats, 1)
 
             # If knowledge base is true in model, then query must also be true
             if knowledge.evaluate(model):
@@ -257,7 +571,165 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def pruned_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query, like `model_check`, but
+    evaluates both sentences in each partial model so that a branch is
+    abandoned as soon as its outcome is known. A single model is
+    extended and undone along the way instead of being copied.
+    If `stats` is a dictionary, the number of partial models checked
+    is added to it.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    model = dict()
+
+    def check_all(i):
+        """Checks if knowledge base entails query in every extension of model."""
+        tally(stats, 1)
+
+        # Knowledge base false or query true in every extension of model
+        known = knowledge.partial(model)
+        if known is False:
+            return True
+        answer = query.partial(model)
+        if answer is True:
+            return True
+        if known is True and answer is False:
+            return False
+
+        # Otherwise try both values of the next symbol, then undo them
+        p = symbols[i]
+        model[p] = True
+        entailed = check_all(i + 1)
+        if entailed:
+            model[p] = False
+            entailed = check_all(i + 1)
+        del model[p]
+        return entailed
+
+    return check_all(0)
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Compiles a logical sentence into a function of a model given as an
+    integer, where the i-th symbol name in `symbols` is true if bit i is
+    set. The function returns a truthy value if the sentence is true.
+
+    Deep or large subformulas are computed into local variables first
+    (see `Sentence.expression`), so that any sentence compiles.
+    """
+    index = {name: i for i, name in enumerate(symbols)}
+    lines = []
+    result = sentence.expression(index, lines, dict())
+    body = "".join(f"    {line}\n" for line in lines)
+    namespace = dict()
+    exec(f"def sentence(m):\n{body}    return {result}\n", namespace)
+    return namespace["sentence"]
+
+
+def compiled_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query, like `model_check`, but
+    compiles both sentences and enumerates models as integers.
+    If `stats` is a dictionary, the number of models checked is added to it.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    entailed = compile_sentence(Implication(knowledge, query), symbols)
+    models = 2 ** len(symbols)
+
+    # The first model where knowledge base is true and query false, if any
+    counterexample = next(itertools.filterfalse(entailed, range(models)), None)
+    if counterexample is None:
+        tally(stats, models)
+        return True
+    tally(stats, counterexample + 1)
+    return False
+
+
+def model_check_all(knowledge, queries):
+    """
+    Checks which of `queries` knowledge base entails, enumerating the
+    models of knowledge base once. Returns a list of booleans, one per query.
+    """
+    symbols = sorted(knowledge.symbols().union(
+        *[query.symbols() for query in queries]
+    ))
+    satisfied = compile_sentence(knowledge, symbols)
+    tests = [compile_sentence(query, symbols) for query in queries]
+
+    # Queries not yet found false in a model of knowledge base
+    pending = list(range(len(queries)))
+    entailed = [True] * len(queries)
+    for model in filter(satisfied, range(2 ** len(symbols))):
+        for i in pending:
+            if not tests[i](model):
+                entailed[i] = False
+        pending = [i for i in pending if entailed[i]]
+
+        # Stop once every query has a counterexample
+        if not pending:
+            break
+    return entailed
+
+
+def truth_columns(symbols):
+    """
+    Returns the truth table columns of `symbols` over all 2 ** n models,
+    as a dictionary from symbol name to integer whose bit m is set if the
+    symbol is true in model m (that is, if bit i of m is set for the i-th
+    symbol), and the column of all models.
+    """
+    size = 2 ** len(symbols)
+    full = (1 << size) - 1
+    columns = dict()
+    for i, name in enumerate(symbols):
+
+        # Runs of 2 ** i false models then 2 ** i true models, repeated
+        # by doubling until they cover every model
+        width = 2 << i
+        column = ((1 << (width // 2)) - 1) << (width // 2)
+        while width < size:
+            column |= column << width
+            width *= 2
+        columns[name] = column
+    return columns, full
+
+
+def truth_table_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query, like `model_check`, but
+    evaluates every model at once with bitwise operations on truth
+    table columns.
+    If `stats` is a dictionary, the number of models checked is added to it.
+    """
+    tally(stats, 2 ** len(knowledge.symbols() | query.symbols()))
+    return truth_table_check_all(knowledge, [query])[0]
+
+
+def truth_table_check_all(knowledge, queries):
+    """
+    Checks which of `queries` knowledge base entails, building the truth
+    table of knowledge base once. Returns a list of booleans, one per query.
+    """
+    symbols = sorted(knowledge.symbols().union(
+        *[query.symbols() for query in queries]
+    ))
+    columns, full = truth_columns(symbols)
+    models = knowledge.truth_table(columns, full)
+    return [
+        models & (full ^ query.truth_table(columns, full)) == 0
+        for query in queries
+    ]
+
+
+def tally(stats, models):
+    """Adds a number of models checked to `stats`, unless it is None."""
+    if stats is not None:
+        stats["models"] = stats.get("models", 0) + models
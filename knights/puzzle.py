@@ -125,8 +125,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            entailed = model_check_all(knowledge, symbols)
+            for symbol, known in zip(symbols, entailed):
+                if known:
                     print(f"    {symbol}")
 
 
@@ -0,0 +1,344 @@
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+class CNF():
+
+    def __init__(self):
+        """
+        Create an empty set of clauses. Clauses are lists of non-zero
+        integers: literal `v` means variable `v` is true, `-v` false.
+        """
+        self.symbols = dict()
+        self.definitions = dict()
+        self.clauses = []
+        self.count = 0
+
+    def variable(self):
+        """Return a new variable."""
+        self.count += 1
+        return self.count
+
+    def add(self, sentence):
+        """Add clauses requiring `sentence` to be true."""
+        self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """
+        Return a literal equivalent to `sentence`, adding the clauses that
+        define it (Tseitin encoding). Equal subformulas share a literal.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.symbols:
+                self.symbols[sentence.name] = self.variable()
+            return self.symbols[sentence.name]
+
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+
+        if sentence in self.definitions:
+            return self.definitions[sentence]
+
+        if isinstance(sentence, And):
+            parts = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            x = self.variable()
+            self.clauses += [[-x, part] for part in parts]
+            self.clauses.append([x] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            x = self.variable()
+            self.clauses += [[x, -part] for part in parts]
+            self.clauses.append([-x] + parts)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            x = self.variable()
+            self.clauses += [[-x, -a, b], [x, a], [x, -b]]
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            x = self.variable()
+            self.clauses += [[-x, -a, b], [-x, a, -b], [x, a, b], [x, -a, -b]]
+        else:
+            raise TypeError(f"cannot convert {sentence!r} to CNF")
+
+        self.definitions[sentence] = x
+        return x
+
+
+class Solver():
+
+    def __init__(self, clauses, count):
+        """
+        Create a CDCL solver for `clauses` over variables 1 to `count`.
+        """
+        self.count = count
+
+        # truth[literal] is the truth value of a literal, or None if
+        # unassigned; negative literals index from the end of the list
+        self.truth = [None] * (2 * count + 1)
+        self.level = [0] * (count + 1)
+        self.reason = [None] * (count + 1)
+        self.phase = [False] * (count + 1)
+        self.activity = [0.0] * (count + 1)
+        self.increment = 1.0
+
+        self.clauses = []
+        self.learnts = dict()
+        self.deleted = set()
+        self.watches = [[] for _ in range(2 * count + 1)]
+        self.trail = []
+        self.levels = []
+        self.head = 0
+        self.heap = [(0.0, v) for v in range(1, count + 1)]
+
+        self.decisions = 0
+        self.conflicts = 0
+        self.propagations = 0
+
+        self.inconsistent = False
+        for clause in clauses:
+            self.add_clause(clause)
+        self.max_learnts = max(len(self.clauses) // 3, 1000)
+
+    def add_clause(self, clause):
+        """Add an input clause, simplifying it first."""
+        clause = list(dict.fromkeys(clause))
+        if any(-literal in clause for literal in clause):
+            return
+        if not clause:
+            self.inconsistent = True
+        elif len(clause) == 1:
+            value = self.truth[clause[0]]
+            if value is False:
+                self.inconsistent = True
+            elif value is None:
+                self.assign(clause[0], None)
+        else:
+            self.watch(clause)
+
+    def watch(self, clause):
+        """Store `clause`, watching its first two literals. Return its index."""
+        self.clauses.append(clause)
+        index = len(self.clauses) - 1
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        """Make `literal` true at the current level because of `reason`."""
+        v = abs(literal)
+        self.truth[literal] = True
+        self.truth[-literal] = False
+        self.level[v] = len(self.levels)
+        self.reason[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assign every literal implied by unit clauses. Return the index of
+        a clause made false, or None if there is no conflict.
+        """
+        truth = self.truth
+        clauses = self.clauses
+        deleted = self.deleted
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            self.propagations += 1
+
+            watching = self.watches[false]
+            kept = []
+            for i, index in enumerate(watching):
+                if index in deleted:
+                    continue
+                clause = clauses[index]
+
+                # Keep the false literal in second position
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if truth[first] is True:
+                    kept.append(index)
+                    continue
+
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    if truth[clause[k]] is not False:
+                        clause[1], clause[k] = clause[k], false
+                        self.watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if truth[first] is False:
+                        kept += watching[i + 1:]
+                        self.watches[false] = kept
+                        return index
+                    self.assign(first, index)
+            self.watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Return the clause learnt from a conflict (first unique implication
+        point), with its asserting literal first, and the level to jump to.
+        """
+        learnt = [None]
+        seen = set()
+        pending = 0
+        literal = None
+        position = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        current = len(self.levels)
+
+        while True:
+            for q in (clause if literal is None else clause[1:]):
+                v = abs(q)
+                if v not in seen and self.level[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.level[v] == current:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+
+            # Walk back along the trail to the next marked literal
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reason[abs(literal)]]
+
+        learnt[0] = -literal
+
+        # Drop literals implied by the rest of the learnt clause
+        marked = {abs(q) for q in learnt}
+        learnt = [learnt[0]] + [
+            q for q in learnt[1:]
+            if self.reason[abs(q)] is None or any(
+                abs(r) not in marked and self.level[abs(r)] > 0
+                for r in self.clauses[self.reason[abs(q)]][1:]
+            )
+        ]
+        if len(learnt) == 1:
+            return learnt, 0
+
+        # The second watch must be the literal assigned last
+        deepest = max(range(1, len(learnt)), key=lambda i: self.level[abs(learnt[i])])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def bump(self, v):
+        """Raise the activity of variable `v`."""
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+        heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def backtrack(self, level):
+        """Undo every assignment made above `level`."""
+        if len(self.levels) <= level:
+            return
+        for literal in self.trail[self.levels[level]:]:
+            v = abs(literal)
+            self.phase[v] = literal > 0
+            self.truth[literal] = None
+            self.truth[-literal] = None
+            self.reason[v] = None
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[self.levels[level]:]
+        del self.levels[level:]
+        self.head = len(self.trail)
+
+    def reduce(self):
+        """
+        Forget the less useful half of the learnt clauses: those spanning
+        the most decision levels when learnt. Clauses spanning at most two
+        levels, and clauses currently implying a literal, are kept.
+        """
+        locked = {self.reason[abs(literal)] for literal in self.trail}
+        candidates = sorted(
+            (index for index, glue in self.learnts.items()
+             if glue > 2 and index not in locked),
+            key=lambda index: self.learnts[index]
+        )
+        for index in candidates[len(candidates) // 2:]:
+            del self.learnts[index]
+            self.deleted.add(index)
+            self.clauses[index] = None
+
+    def decide(self):
+        """
+        Assign the most active unassigned variable its last value.
+        Return False if every variable is already assigned.
+        """
+        while self.heap:
+            _, v = heapq.heappop(self.heap)
+            if self.truth[v] is None:
+                self.decisions += 1
+                self.levels.append(len(self.trail))
+                self.assign(v if self.phase[v] else -v, None)
+                return True
+        return False
+
+    def solve(self):
+        """Return True if the clauses are satisfiable, False otherwise."""
+        if self.inconsistent:
+            return False
+        restart = 100
+        since_restart = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                since_restart += 1
+                if not self.levels:
+                    return False
+
+                learnt, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    index = self.watch(learnt)
+                    self.learnts[index] = len({self.level[abs(q)] for q in learnt})
+                    self.assign(learnt[0], index)
+                self.increment /= 0.95
+
+            # Restart now and then, keeping learnt clauses and phases
+            elif since_restart >= restart:
+                since_restart = 0
+                restart = int(restart * 1.5)
+                self.backtrack(0)
+            elif len(self.learnts) >= self.max_learnts:
+                self.reduce()
+                self.max_learnts = int(self.max_learnts * 1.1)
+            elif not self.decide():
+                return True
+
+    def model(self):
+        """Return the satisfying assignment found, as a list by variable."""
+        return [None] + [bool(self.truth[v]) for v in range(1, self.count + 1)]
+
+
+def sat_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query, by checking that knowledge
+    base and the negation of query cannot both be true.
+    If `stats` is a dictionary, solver counters are added to it.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    solver = Solver(cnf.clauses, cnf.count)
+    entailed = not solver.solve()
+
+    if stats is not None:
+        for name in ["decisions", "conflicts", "propagations"]:
+            stats[name] = stats.get(name, 0) + getattr(solver, name)
+    return entailed
@@ -0,0 +1,141 @@
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+from crawler import crawl_graph
+from engine import ConvergenceStats, LinkGraph, random_surfers, solve
+from pagerank import DAMPING, MAX_ITERATIONS, TOLERANCE, iterate_pagerank
+
+SIZES = [1000, 10000, 100000]
+LINKS_PER_PAGE = 8
+EXPONENT = 1.1
+
+# The dictionary engine is skipped on graphs larger than this
+DICT_LIMIT = 100000
+
+# Number of samples drawn per page, and surfers used, by the sampling engine
+SAMPLES_PER_PAGE = 100
+SURFERS = 10000
+
+
+def main():
+    targets = sys.argv[1:] or [str(size) for size in SIZES]
+    print(f"{'engine':<10} {'pages':>9} {'links':>10} {'iterations':>10} "
+          f"{'residual':>10} {'seconds':>9} {'peak MB':>9}")
+    for target in targets:
+
+        # Either rank a corpus directory, or a synthetic graph of given size
+        stats = ConvergenceStats()
+        if os.path.isdir(target):
+            with stats.phase("crawl"):
+                graph = crawl_graph(target, cache=False)
+        else:
+            with stats.phase("generate"):
+                graph = power_law_graph(int(target), LINKS_PER_PAGE, EXPONENT)
+
+        corpus = None
+        for engine in ENGINES:
+            if engine == "dict":
+                if graph.size > DICT_LIMIT:
+                    continue
+                corpus = graph_corpus(graph)
+            run_stats, peak = benchmark(engine, graph, corpus)
+            stats.phases[engine] = run_stats.phases["rank"]
+            residual = (f"{run_stats.residuals[-1]:.2e}"
+                        if run_stats.residuals else "-")
+            print(f"{engine:<10} {graph.size:>9} {len(graph.indices):>10} "
+                  f"{run_stats.iterations or '-':>10} {residual:>10} "
+                  f"{run_stats.phases['rank']:>9.3f} {peak / 2 ** 20:>9.1f}")
+
+        phases = ", ".join(
+            f"{name} {seconds:.3f}s" for name, seconds in stats.phases.items()
+        )
+        print(f"  {target}: {phases}")
+
+
+def power_law_graph(size, links_per_page, exponent, seed=0):
+    """
+    Return a random `LinkGraph` with `size` pages, where each page has
+    on average `links_per_page` links and the number of links pointing
+    to a page follows a power law with the given `exponent`.
+    """
+    rng = np.random.default_rng(seed)
+    degrees = rng.poisson(links_per_page, size)
+    sources = np.repeat(np.arange(size), degrees)
+
+    # Popular pages are spread at random over the page ids
+    popularity = rng.permutation(np.arange(1, size + 1) ** -exponent)
+    targets = rng.choice(size, len(sources), p=popularity / popularity.sum())
+
+    pages = [f"{i}.html" for i in range(size)]
+    return LinkGraph.from_edges(pages, sources, targets)
+
+
+def graph_corpus(graph):
+    """
+    Return the corpus dictionary of page names to linked page names
+    represented by `graph`.
+    """
+    return {
+        page: {graph.pages[j]
+               for j in graph.indices[graph.indptr[i]:graph.indptr[i + 1]]}
+        for i, page in enumerate(graph.pages)
+    }
+
+
+def benchmark(engine, graph, corpus):
+    """
+    Rank `graph` (or, for the dictionary engine, the same graph as a
+    `corpus` dictionary) with `engine`, once to time it and once under
+    `tracemalloc` to measure its peak memory use. Each run gets a fresh
+    copy of `graph`, so that both include building its transition matrix.
+    Return the statistics of the timed run and the peak memory in bytes.
+    """
+    stats = ConvergenceStats()
+    run = ENGINES[engine]
+    with stats.phase("rank"):
+        run(fresh(graph), corpus, stats)
+
+    tracemalloc.start()
+    try:
+        run(fresh(graph), corpus, None)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return stats, peak
+
+
+def fresh(graph):
+    """
+    Return a copy of `graph` sharing its link arrays but none of its
+    cached structures.
+    """
+    return LinkGraph(graph.pages, graph.indptr, graph.indices)
+
+
+ENGINES = {
+    "dict": lambda graph, corpus, stats: iterate_pagerank(
+        corpus, DAMPING, TOLERANCE, MAX_ITERATIONS, stats
+    ),
+    "sparse": lambda graph, corpus, stats: solve(
+        graph, DAMPING, TOLERANCE, MAX_ITERATIONS, "power", callback=stats
+    ),
+    "seidel": lambda graph, corpus, stats: solve(
+        graph, DAMPING, TOLERANCE, MAX_ITERATIONS, "gauss-seidel", callback=stats
+    ),
+    "aitken": lambda graph, corpus, stats: solve(
+        graph, DAMPING, TOLERANCE, MAX_ITERATIONS, "aitken", callback=stats
+    ),
+    "quadratic": lambda graph, corpus, stats: solve(
+        graph, DAMPING, TOLERANCE, MAX_ITERATIONS, "quadratic", callback=stats
+    ),
+    "sampling": lambda graph, corpus, stats: random_surfers(
+        graph, DAMPING, SAMPLES_PER_PAGE * graph.size, SURFERS
+    )
+}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import mmap
+import multiprocessing
+import os
+import re
+
+import numpy as np
+
+from engine import LinkGraph
+
+LINK = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Corpora smaller than this are parsed without starting a process pool
+POOL_THRESHOLD = 256
+
+# Page ids of the corpus being crawled, shared with each worker process
+_corpus = None
+
+
+def crawl_graph(directory, processes=None, cache=True):
+    """
+    Parse a directory of HTML pages into a `LinkGraph`, scanning pages
+    in parallel across `processes` worker processes.
+
+    If `cache` is True, the parsed graph is saved next to the directory
+    and reused as long as no page in the directory has been modified.
+    """
+    key = corpus_mtime(directory)
+    path = cache_path(directory)
+    if cache:
+        graph = load_cache(path, key)
+        if graph is not None:
+            return graph
+
+    pages = sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    )
+    index = {page: i for i, page in enumerate(pages)}
+    jobs = [(i, os.path.join(directory, page)) for i, page in enumerate(pages)]
+
+    # Collect the out-links of every page as arrays of page ids
+    if processes == 1 or len(pages) < POOL_THRESHOLD:
+        _start_worker(index)
+        links = list(map(page_links, jobs))
+    else:
+        workers = processes or os.cpu_count() or 1
+        chunksize = max(1, len(jobs) // (4 * workers))
+        with multiprocessing.Pool(workers, _start_worker, (index,)) as pool:
+            links = list(pool.imap_unordered(page_links, jobs, chunksize))
+
+    sources = np.concatenate(
+        [np.full(len(targets), source) for source, targets in links]
+        or [np.empty(0, dtype=np.int64)]
+    )
+    targets = np.concatenate(
+        [targets for _, targets in links]
+        or [np.empty(0, dtype=np.int64)]
+    )
+    graph = LinkGraph.from_edges(pages, sources, targets)
+    graph._index = index
+
+    if cache:
+        save_cache(path, key, graph)
+    return graph
+
+
+def _start_worker(index):
+    """
+    Make the page ids of the corpus available to `page_links`.
+    """
+    global _corpus
+    _corpus = index
+
+
+def page_links(job):
+    """
+    Scan the HTML file of a page for links to other pages in the corpus.
+    `job` is a pair of the page id and the path of its file.
+
+    Return the page id and an array of the ids of the pages it links to.
+    """
+    source, path = job
+    targets = set()
+    with open(path, "rb") as f:
+
+        # Empty files cannot be memory-mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            return source, np.empty(0, dtype=np.int64)
+
+        # Let the regular expression scan the mapped file directly,
+        # without reading its contents into memory
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+            for match in LINK.finditer(contents):
+                link = _corpus.get(match.group(1).decode(errors="replace"))
+                if link is not None and link != source:
+                    targets.add(link)
+
+    return source, np.fromiter(targets, dtype=np.int64, count=len(targets))
+
+
+def corpus_mtime(directory):
+    """
+    Return the most recent modification time, in nanoseconds, of the
+    directory or any of the HTML pages inside it.
+
+    The directory's own time changes when pages are added, removed or
+    renamed; editing a page in place only changes the page's time.
+    """
+    latest = os.stat(directory).st_mtime_ns
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".html"):
+                latest = max(latest, entry.stat().st_mtime_ns)
+    return latest
+
+
+def cache_path(directory):
+    """
+    Return the path of the edge-list cache for a corpus directory.
+    The cache lives beside the directory so writing it does not change
+    the directory's modification time.
+    """
+    return os.path.normpath(directory) + ".edges.npz"
+
+
+def load_cache(path, key):
+    """
+    Return the `LinkGraph` cached at `path`, or None if there is no cache
+    or it was built from a corpus with a different modification time.
+    """
+    try:
+        with np.load(path) as data:
+            if int(data["key"]) != key:
+                return None
+            return LinkGraph(
+                data["pages"].tolist(), data["indptr"], data["indices"]
+            )
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_cache(path, key, graph):
+    """
+    Save the link structure of `graph` to `path`, tagged with `key`.
+    """
+    try:
+        with open(path, "wb") as f:
+            np.savez(
+                f, key=np.int64(key), pages=np.array(graph.pages, dtype=str),
+                indptr=graph.indptr, indices=graph.indices
+            )
+    except OSError:
+        pass
@@ -0,0 +1,630 @@
+import collections
+import contextlib
+import os
+import time
+import tracemalloc
+
+import numpy as np
+from scipy import sparse
+
+METHODS = ["power", "gauss-seidel", "aitken", "quadratic"]
+
+# Blocks of pages updated one after the other in a Gauss-Seidel sweep;
+# more blocks propagate new ranks sooner but take more steps per sweep
+BLOCKS = 64
+
+# Iterations between two extrapolation steps
+EXTRAPOLATION_PERIOD = 10
+
+
+class LinkGraph():
+
+    def __init__(self, pages, indptr, indices):
+        """
+        Create a new link graph from a list of page names and the
+        compressed (CSR) out-link structure: the pages linked to by
+        page `i` are `indices[indptr[i]:indptr[i + 1]]`.
+        """
+        self.pages = pages
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.size = len(pages)
+
+        # Pages without any outgoing links
+        self.out_degree = np.diff(self.indptr)
+        self.dangling = self.out_degree == 0
+
+        self._index = None
+        self._matrix = None
+
+    @property
+    def index(self):
+        """Mapping from page name to its integer id."""
+        if self._index is None:
+            self._index = {page: i for i, page in enumerate(self.pages)}
+        return self._index
+
+    @property
+    def matrix(self):
+        """
+        Column-stochastic transition matrix: matrix[j, i] is the
+        probability of following a link from page i to page j.
+        """
+        if self._matrix is None:
+            weights = np.repeat(
+                1 / np.maximum(self.out_degree, 1), self.out_degree
+            )
+            links = sparse.csr_matrix(
+                (weights, self.indices, self.indptr),
+                shape=(self.size, self.size)
+            )
+            self._matrix = links.T.tocsr()
+        return self._matrix
+
+    @classmethod
+    def from_edges(cls, pages, sources, targets):
+        """
+        Create a link graph from parallel arrays of integer page ids,
+        where page `sources[k]` links to page `targets[k]`.
+        Duplicate links and links from a page to itself are dropped.
+        """
+        size = len(pages)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        # Sorting the encoded edges groups them by source page
+        keep = sources != targets
+        edges = np.unique(sources[keep] * size + targets[keep])
+        sources, targets = np.divmod(edges, size)
+
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=size), out=indptr[1:])
+        return cls(pages, indptr, targets)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Create a link graph from a corpus dictionary mapping each page
+        name to the set of page names it links to.
+        """
+        pages = list(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        sources = []
+        targets = []
+        for page in pages:
+            for link in corpus[page]:
+                sources.append(index[page])
+                targets.append(index[link])
+        graph = cls.from_edges(pages, sources, targets)
+        graph._index = index
+        return graph
+
+    def edges(self):
+        """
+        Return parallel arrays of the source and target ids of every link.
+        """
+        sources = np.repeat(np.arange(self.size), self.out_degree)
+        return sources, self.indices.astype(np.int64)
+
+    def update(self, added_pages=(), removed_pages=(),
+               added_links=(), removed_links=()):
+        """
+        Return a new link graph with the given pages and links added or
+        removed. Links are (source, target) pairs of page names; links
+        to or from a removed page are removed with it.
+        """
+        removed_pages = set(removed_pages)
+        pages = [page for page in self.pages if page not in removed_pages]
+        pages += [page for page in dict.fromkeys(added_pages)
+                  if page not in self.index and page not in removed_pages]
+        index = {page: i for i, page in enumerate(pages)}
+
+        # Renumber the existing links, dropping those of removed pages
+        ids = np.array([index.get(page, -1) for page in self.pages],
+                       dtype=np.int64)
+        sources, targets = self.edges()
+        sources, targets = ids[sources], ids[targets]
+        keep = (sources >= 0) & (targets >= 0)
+        if removed_links:
+            removed = np.array([
+                index[source] * len(pages) + index[target]
+                for source, target in removed_links
+                if source in index and target in index
+            ], dtype=np.int64)
+            keep &= ~np.isin(sources * len(pages) + targets, removed)
+
+        added = [(index[source], index[target])
+                 for source, target in added_links
+                 if source in index and target in index]
+        added = np.array(added, dtype=np.int64).reshape(-1, 2)
+
+        graph = LinkGraph.from_edges(
+            pages,
+            np.concatenate([sources[keep], added[:, 0]]),
+            np.concatenate([targets[keep], added[:, 1]])
+        )
+        graph._index = index
+        return graph
+
+    def ranks(self, vector):
+        """
+        Return a dictionary mapping each page name to its value in `vector`.
+        """
+        return dict(zip(self.pages, vector.tolist()))
+
+
+class ConvergenceStats():
+
+    def __init__(self):
+        """
+        Create a new record of the progress of a ranking run. Pass the
+        object as the `callback` of a solver to record each iteration,
+        and use `phase` to time the stages of a run.
+        """
+        self.residuals = []
+        self.times = []
+        self.memory = []
+        self.phases = dict()
+        self.start = time.perf_counter()
+
+    def __call__(self, iteration, residual):
+        """Record the L1 residual reached by an iteration."""
+        self.residuals.append(float(residual))
+        self.times.append(time.perf_counter() - self.start)
+        self.memory.append(memory_usage())
+
+    @property
+    def iterations(self):
+        return len(self.residuals)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Add the wall time spent inside the block to phase `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (self.phases.get(name, 0)
+                                 + time.perf_counter() - started)
+
+
+def memory_usage():
+    """
+    Return the memory currently allocated by Python, in bytes, if
+    `tracemalloc` is tracing; otherwise the current resident memory of
+    the process, or None if it cannot be measured.
+    """
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+
+    # The second field of statm counts resident pages (Linux only)
+    try:
+        with open("/proc/self/statm") as f:
+            resident = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident * os.sysconf("SC_PAGE_SIZE")
+
+
+def power_iteration(graph, damping_factor, tolerance, max_iterations,
+                    start=None, region=None, callback=None):
+    """
+    Return the PageRank vector of `graph` and the number of iterations
+    taken, by repeatedly applying the transition model to a rank vector
+    until the L1 change between two iterations drops below `tolerance`
+    or `max_iterations` iterations have been made.
+
+    Iteration begins from the rank vector `start` if given, or from
+    the uniform distribution otherwise. If `region` is an array of page
+    ids, only the ranks of those pages are updated. If `callback` is
+    given, it is called with the iteration number and L1 residual after
+    every iteration.
+
+    Dangling pages are treated as linking to every page in the graph.
+    """
+    n = graph.size
+    ranks = np.full(n, 1 / n) if start is None else np.array(start, dtype=float)
+    matrix = graph.matrix if region is None else graph.matrix[region]
+
+    iteration = 0
+    while iteration < max_iterations:
+        iteration += 1
+
+        # Rank flowing out of pages without links is spread over all pages
+        dangling_rank = ranks[graph.dangling].sum()
+        new_ranks = damping_factor * (matrix @ ranks)
+        new_ranks += (damping_factor * dangling_rank + 1 - damping_factor) / n
+
+        if region is None:
+            residual = np.abs(new_ranks - ranks).sum()
+            ranks = new_ranks
+        else:
+            residual = np.abs(new_ranks - ranks[region]).sum()
+            ranks[region] = new_ranks
+        if callback is not None:
+            callback(iteration, residual)
+        if residual < tolerance:
+            break
+
+    return ranks / ranks.sum(), iteration
+
+
+def solve(graph, damping_factor, tolerance, max_iterations, method="power",
+          start=None, callback=None):
+    """
+    Return the PageRank vector of `graph` and the number of iterations
+    taken, using the solver named by `method`:
+
+        * "power", plain power iteration (see `power_iteration`);
+        * "gauss-seidel", in-place updates (see `gauss_seidel`);
+        * "aitken" or "quadratic", power iteration accelerated by
+          periodic extrapolation (see `extrapolated_power_iteration`).
+
+    `start` and `callback` are used as in `power_iteration`.
+    """
+    if method == "power":
+        return power_iteration(graph, damping_factor, tolerance,
+                               max_iterations, start, callback=callback)
+    if method == "gauss-seidel":
+        return gauss_seidel(graph, damping_factor, tolerance,
+                            max_iterations, start, callback)
+    if method in ["aitken", "quadratic"]:
+        return extrapolated_power_iteration(graph, damping_factor, tolerance,
+                                            max_iterations, method, start,
+                                            callback)
+    raise ValueError(f"unknown method {method!r}, expected one of {METHODS}")
+
+
+def gauss_seidel(graph, damping_factor, tolerance, max_iterations,
+                 start=None, callback=None, block_size=None):
+    """
+    Return the PageRank vector of `graph` and the number of sweeps taken,
+    updating ranks in place so that each block of `block_size` pages
+    already uses the new ranks of the blocks before it in the sweep.
+    A `block_size` of 1 gives classic Gauss-Seidel; by default, pages
+    are split into `BLOCKS` blocks, so that even small graphs are not
+    updated as a single block (which would be plain power iteration).
+
+    Stopping, `start` and `callback` work as in `power_iteration`.
+    """
+    n = graph.size
+    ranks = np.full(n, 1 / n) if start is None else np.array(start, dtype=float)
+    if block_size is None:
+        block_size = -(-n // BLOCKS)
+    blocks = [
+        (low, min(low + block_size, n), graph.matrix[low:low + block_size])
+        for low in range(0, n, block_size)
+    ]
+
+    iteration = 0
+    while iteration < max_iterations:
+        iteration += 1
+        previous = ranks.copy()
+
+        # Keep the dangling rank current as blocks are updated
+        dangling_rank = ranks[graph.dangling].sum()
+        for low, high, rows in blocks:
+            new_ranks = damping_factor * (rows @ ranks)
+            new_ranks += (damping_factor * dangling_rank + 1 - damping_factor) / n
+            dangling = graph.dangling[low:high]
+            dangling_rank += (new_ranks[dangling] - ranks[low:high][dangling]).sum()
+            ranks[low:high] = new_ranks
+
+        # Sweeps do not preserve the total rank, so restore it each time
+        ranks /= ranks.sum()
+        residual = np.abs(ranks - previous).sum()
+        if callback is not None:
+            callback(iteration, residual)
+        if residual < tolerance:
+            break
+
+    return ranks / ranks.sum(), iteration
+
+
+def extrapolated_power_iteration(graph, damping_factor, tolerance,
+                                 max_iterations, method="aitken", start=None,
+                                 callback=None, period=EXTRAPOLATION_PERIOD):
+    """
+    Return the PageRank vector of `graph` and the number of iterations
+    taken by power iteration where, every `period` iterations, the last
+    few iterates are combined into an estimate of the limit, using
+    Aitken extrapolation if `method` is "aitken" or quadratic
+    extrapolation if it is "quadratic". An estimate is only kept if
+    it lowers the residual, which costs one extra iteration to check.
+
+    Stopping, `start` and `callback` work as in `power_iteration`.
+    """
+    extrapolate = aitken if method == "aitken" else quadratic_extrapolation
+    needed = 3 if method == "aitken" else 4
+
+    n = graph.size
+    ranks = np.full(n, 1 / n) if start is None else np.array(start, dtype=float)
+    history = collections.deque([ranks], maxlen=needed)
+
+    iteration = 0
+    while iteration < max_iterations:
+        iteration += 1
+        new_ranks = google_step(graph, ranks, damping_factor)
+        residual = np.abs(new_ranks - ranks).sum()
+        history.append(new_ranks)
+
+        # Try replacing the iterate by the extrapolated limit
+        if (iteration % period == 0 and len(history) == needed
+                and iteration < max_iterations):
+            iteration += 1
+            estimate = extrapolate(*history)
+            stepped = google_step(graph, estimate, damping_factor)
+            if np.abs(stepped - estimate).sum() < residual:
+                new_ranks = stepped
+                residual = np.abs(stepped - estimate).sum()
+                history = collections.deque([new_ranks], maxlen=needed)
+
+        ranks = new_ranks
+        if callback is not None:
+            callback(iteration, residual)
+        if residual < tolerance:
+            break
+
+    return ranks / ranks.sum(), iteration
+
+
+def google_step(graph, ranks, damping_factor):
+    """
+    Return the rank vector after one step of the random surfer from `ranks`.
+    """
+    dangling_rank = ranks[graph.dangling].sum()
+    new_ranks = damping_factor * (graph.matrix @ ranks)
+    new_ranks += (damping_factor * dangling_rank + 1 - damping_factor) / graph.size
+    return new_ranks
+
+
+def aitken(x0, x1, x2):
+    """
+    Return the Aitken extrapolation of three successive rank vectors,
+    computed for each page independently.
+
+    Only pages whose ranks converge geometrically (successive changes
+    in the same direction, shrinking) are extrapolated; others keep
+    their latest rank.
+    """
+    step = x2 - x1
+    previous_step = x1 - x0
+    ratio = np.zeros_like(x2)
+    np.divide(step, previous_step, out=ratio, where=previous_step != 0)
+    safe = (ratio > 0) & (ratio < 1)
+
+    limit = x2.copy()
+    limit[safe] += step[safe] * ratio[safe] / (1 - ratio[safe])
+    return normalized(limit)
+
+
+def quadratic_extrapolation(x0, x1, x2, x3):
+    """
+    Return the quadratic extrapolation of four successive rank vectors,
+    which removes the components of the two largest non-principal
+    eigenvalues from the error.
+    """
+    differences = np.column_stack([x1 - x0, x2 - x0])
+    (gamma1, gamma2), *_ = np.linalg.lstsq(differences, -(x3 - x0), rcond=None)
+    limit = (gamma1 + gamma2 + 1) * x1 + (gamma2 + 1) * x2 + x3
+    return normalized(limit)
+
+
+def normalized(ranks):
+    """
+    Return `ranks` with negative values cut to zero and scaled to sum to 1.
+    """
+    ranks = np.maximum(ranks, 0)
+    return ranks / ranks.sum()
+
+
+def personalized_power_iteration(graph, damping_factor, teleports,
+                                 tolerance, max_iterations, callback=None):
+    """
+    Return personalized PageRank vectors of `graph` for many teleport
+    distributions at once, and the number of iterations taken.
+
+    `teleports` is an array with one row per page and one column per
+    distribution; a surfer who jumps (or leaves a dangling page) lands
+    on a page chosen according to the column's weights. The result has
+    the same shape, with each column summing to 1. Iteration stops once
+    the L1 change of every column drops below `tolerance`; `callback`
+    is called as in `power_iteration` with the largest column change.
+    Raise a ValueError if the weights of a column do not sum to more than 0.
+    """
+    teleports = np.asarray(teleports, dtype=float)
+    totals = teleports.sum(axis=0)
+    if not np.all(totals > 0):
+        column = np.flatnonzero(~(totals > 0))[0]
+        raise ValueError(f"teleport weights of column {column} must sum to more than 0")
+    teleports = teleports / totals
+    ranks = teleports.copy()
+
+    iteration = 0
+    while iteration < max_iterations:
+        iteration += 1
+
+        # One sparse product advances every distribution together
+        dangling_rank = ranks[graph.dangling].sum(axis=0)
+        new_ranks = damping_factor * (graph.matrix @ ranks)
+        new_ranks += (damping_factor * dangling_rank + 1 - damping_factor) * teleports
+
+        residual = np.abs(new_ranks - ranks).sum(axis=0).max()
+        ranks = new_ranks
+        if callback is not None:
+            callback(iteration, residual)
+        if residual < tolerance:
+            break
+
+    return ranks / ranks.sum(axis=0), iteration
+
+
+def incremental_power_iteration(old_graph, old_ranks, graph, damping_factor,
+                                tolerance, max_iterations, hops=None,
+                                method="power", callback=None):
+    """
+    Return the PageRank vector of `graph` and the number of full
+    iterations taken, warm-starting from the ranks `old_ranks` previously
+    computed for `old_graph`.
+
+    If `hops` is given, the ranks of the region affected by the changes
+    (see `affected_region`) are first brought to convergence on their
+    own, before iterating over the whole graph.
+    """
+    start = warm_start(old_graph, old_ranks, graph)
+    if hops is not None:
+        region = affected_region(old_graph, graph, hops)
+        start, _ = power_iteration(graph, damping_factor, tolerance,
+                                   max_iterations, start, region)
+    return solve(graph, damping_factor, tolerance, max_iterations,
+                 method, start, callback)
+
+
+def warm_start(old_graph, old_ranks, graph):
+    """
+    Return a starting rank vector for `graph` built from the ranks
+    `old_ranks` of `old_graph`. Pages new to `graph` start with an
+    equal share of rank.
+    """
+    ranks = np.full(graph.size, 1 / graph.size)
+    ids = renumbering(old_graph, graph)
+    kept = ids >= 0
+    ranks[ids[kept]] = old_ranks[kept]
+    return ranks / ranks.sum()
+
+
+def renumbering(old_graph, graph):
+    """
+    Return an array mapping the id of each page of `old_graph` to its
+    id in `graph`, or to -1 if the page was removed.
+    """
+    # Pages only added at the end, as by `LinkGraph.update`, keep their ids
+    if graph.pages[:old_graph.size] == list(old_graph.pages):
+        return np.arange(old_graph.size)
+
+    index = graph.index
+    return np.array([index.get(page, -1) for page in old_graph.pages],
+                    dtype=np.int64)
+
+
+def out_links(graph, ids):
+    """
+    Return the ids of every page linked to by the pages `ids` of `graph`.
+    """
+    starts = graph.indptr[ids]
+    counts = graph.indptr[ids + 1] - starts
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return graph.indices[np.repeat(starts, counts) + offsets]
+
+
+def affected_region(old_graph, graph, hops):
+    """
+    Return the ids of the pages of `graph` whose rank may have changed
+    since `old_graph`: new pages, pages whose links changed, the pages
+    they link to (before or after the change), and every page reachable
+    from those within `hops` further links.
+    """
+    n = graph.size
+    ids = renumbering(old_graph, graph)
+
+    # Pages whose outgoing links changed, starting with new pages
+    changed = np.ones(n, dtype=bool)
+    changed[ids[ids >= 0]] = False
+    seeds = np.zeros(n, dtype=bool)
+
+    # Links to or from removed pages change the page at their other end
+    old_sources, old_targets = old_graph.edges()
+    old_sources, old_targets = ids[old_sources], ids[old_targets]
+    kept = (old_sources >= 0) & (old_targets >= 0)
+    changed[old_sources[(old_sources >= 0) & (old_targets < 0)]] = True
+    seeds[old_targets[(old_targets >= 0) & (old_sources < 0)]] = True
+
+    # Links in only one of the two graphs, encoded as source * n + target:
+    # after sorting both (duplicate-free) sets of keys together, those
+    # are the keys not equal to a neighbor. Both sets are usually sorted
+    # already, which a stable sort merges in linear time
+    sources, targets = graph.edges()
+    keys = np.concatenate([old_sources[kept] * n + old_targets[kept],
+                           sources * n + targets])
+    keys.sort(kind="stable")
+    unequal = np.concatenate([[True], keys[1:] != keys[:-1], [True]])
+    links = keys[unequal[:-1] & unequal[1:]]
+    link_sources, link_targets = np.divmod(links, n)
+    changed[link_sources] = True
+    seeds[link_targets] = True
+
+    # Every page linked to by a changed page gets a new share of its rank
+    changed_ids = np.flatnonzero(changed)
+    seeds[changed_ids] = True
+    seeds[out_links(graph, changed_ids)] = True
+
+    # Follow links outward from the changed pages
+    region = seeds
+    frontier = np.flatnonzero(seeds)
+    for _ in range(hops):
+        reached = np.zeros(n, dtype=bool)
+        reached[out_links(graph, frontier)] = True
+        frontier = np.flatnonzero(reached & ~region)
+        if not len(frontier):
+            break
+        region[frontier] = True
+
+    return np.flatnonzero(region)
+
+
+def save_state(path, graph, ranks):
+    """
+    Save `graph` and its rank vector `ranks` to `path`.
+    """
+    with open(path, "wb") as f:
+        np.savez(f, pages=np.array(graph.pages, dtype=str),
+                 indptr=graph.indptr, indices=graph.indices, ranks=ranks)
+
+
+def load_state(path):
+    """
+    Return the graph and rank vector saved to `path` by `save_state`.
+    """
+    with np.load(path) as data:
+        graph = LinkGraph(data["pages"].tolist(), data["indptr"], data["indices"])
+        return graph, data["ranks"]
+
+
+def random_surfers(graph, damping_factor, n, surfers, seed=None):
+    """
+    Return PageRank values for `graph` estimated from `n` samples drawn
+    by `surfers` independent random surfers walking in lock-step, each
+    starting on a page chosen at random.
+
+    At every step a surfer follows one of the current page's links,
+    chosen uniformly, with probability `damping_factor`; otherwise (or
+    if the page has no links) it jumps to a page chosen uniformly.
+    """
+    rng = np.random.default_rng(seed)
+    size = graph.size
+    visits = np.zeros(size, dtype=np.int64)
+
+    # Each page's links are the slice of `indices` starting at `indptr`
+    starts = graph.indptr[:-1]
+    degrees = graph.out_degree
+
+    pages = rng.integers(size, size=min(surfers, n))
+    remaining = n
+    while remaining > 0:
+
+        # The final step may only need some of the surfers
+        if remaining < len(pages):
+            pages = pages[:remaining]
+        visits += np.bincount(pages, minlength=size)
+        remaining -= len(pages)
+
+        # Choose the next page for every surfer at once
+        jump = (rng.random(len(pages)) >= damping_factor) | graph.dangling[pages]
+        links = pages
+        if len(graph.indices):
+            choice = (rng.random(len(pages)) * degrees[pages]).astype(np.int64)
+            links = graph.indices[np.minimum(starts[pages] + choice,
+                                             len(graph.indices) - 1)]
+        pages = np.where(jump, rng.integers(size, size=len(pages)), links)
+
+    return visits / n
@@ -0,0 +1,114 @@
+import sys
+
+import numpy as np
+
+from crawler import crawl_graph
+from engine import LinkGraph
+
+MAGIC = b"PRGRAPH1"
+
+# Magic bytes, then the number of pages and links as 64-bit integers
+HEADER = np.dtype([("magic", "S8"), ("pages", "<i8"), ("links", "<i8")])
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python graphfile.py corpus output.graph")
+    graph = crawl_graph(sys.argv[1])
+    write_graph(sys.argv[2], graph)
+    print(f"Wrote {graph.size} pages and {len(graph.indices)} links "
+          f"to {sys.argv[2]}")
+
+
+class StringTable():
+
+    def __init__(self, offsets, data):
+        """
+        Create a read-only sequence of strings, where string `i` is the
+        UTF-8 text `data[offsets[i]:offsets[i + 1]]`. Strings are only
+        decoded when they are looked up.
+        """
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string index out of range")
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode()
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def layout(pages, links, text):
+    """
+    Return the byte offsets of the sections of a graph file with the
+    given number of pages, links and bytes of page names.
+    Every section starts on an 8-byte boundary.
+    """
+    def align(offset):
+        return (offset + 7) // 8 * 8
+
+    offsets = HEADER.itemsize
+    targets = offsets + 8 * (pages + 1)
+    names = align(targets + 4 * links)
+    text_start = names + 8 * (pages + 1)
+    return offsets, targets, names, text_start, text_start + text
+
+
+def write_graph(path, graph):
+    """
+    Write `graph` to `path` in the binary graph format: a header, the
+    offsets of each page's links, the int32 ids of every link target,
+    and a table of page names.
+    """
+    names = [page.encode() for page in graph.pages]
+    name_offsets = np.zeros(len(names) + 1, dtype="<i8")
+    np.cumsum([len(name) for name in names], out=name_offsets[1:])
+
+    sections = layout(graph.size, len(graph.indices), int(name_offsets[-1]))
+    header = np.array([(MAGIC, graph.size, len(graph.indices))], dtype=HEADER)
+    with open(path, "wb") as f:
+        for start, data in zip((0,) + sections, [
+            header.tobytes(),
+            graph.indptr.astype("<i8").tobytes(),
+            graph.indices.astype("<i4").tobytes(),
+            name_offsets.tobytes(),
+            b"".join(names)
+        ]):
+            f.write(b"\0" * (start - f.tell()))
+            f.write(data)
+
+
+def read_graph(path):
+    """
+    Return the `LinkGraph` stored at `path` in the binary graph format.
+    The link arrays and page names are memory-mapped, not read.
+    """
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    if len(header) == 0 or header["magic"][0] != MAGIC:
+        raise ValueError(f"{path} is not a graph file")
+    pages = int(header["pages"][0])
+    links = int(header["links"][0])
+
+    offsets, targets, names, text, _ = layout(pages, links, 0)
+    data = np.memmap(path, mode="r")
+    indptr = data[offsets:targets].view("<i8")
+    indices = data[targets:targets + 4 * links].view("<i4")
+    name_offsets = data[names:text].view("<i8")
+    return LinkGraph(
+        StringTable(name_offsets, data[text:text + name_offsets[-1]]),
+        indptr, indices
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,24 +3,71 @@ import random
 import re
 import sys
 
+import numpy as np
+
+from crawler import crawl_graph
+from engine import (LinkGraph, incremental_power_iteration, load_state,
+                    personalized_power_iteration, random_surfers, save_state,
+                    solve)
+from graphfile import read_graph
+
 DAMPING = 0.85
 SAMPLES = 10000
+SURFERS = 100
+
+# Iteration stops once the total (L1) change of the ranks is below this
+TOLERANCE = 0.001
+MAX_ITERATIONS = 1000
+METHOD = "power"
+
+# Hops around changed pages converged on their own before a warm-started
+# run (see `affected_region`); None skips that step, as the warm start
+# alone usually converges in a few iterations
+REGION_HOPS = None
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python pagerank.py corpus [state]")
+
+    # A corpus is either a directory of HTML pages or a binary graph file
+    if os.path.isdir(sys.argv[1]):
+        graph = crawl_graph(sys.argv[1])
+    else:
+        graph = read_graph(sys.argv[1])
+    state = sys.argv[2] if len(sys.argv) == 3 else None
+    ranks = graph.ranks(random_surfers(graph, DAMPING, SAMPLES, SURFERS))
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    ranks = rank_graph(graph, DAMPING, state)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
 
+def rank_graph(graph, damping_factor, state=None):
+    """
+    Return PageRank values for each page of a `LinkGraph` by iteration.
+
+    If `state` is the path of a file, the graph and ranks of the previous
+    run saved there are used to warm-start the iteration, and the new
+    graph and ranks are saved there for the next run.
+    """
+    if state is not None and os.path.exists(state):
+        old_graph, old_ranks = load_state(state)
+        ranks, _ = incremental_power_iteration(
+            old_graph, old_ranks, graph, damping_factor,
+            TOLERANCE, MAX_ITERATIONS, REGION_HOPS, METHOD
+        )
+    else:
+        ranks, _ = solve(graph, damping_factor, TOLERANCE, MAX_ITERATIONS, METHOD)
+
+    if state is not None:
+        save_state(state, graph, ranks)
+    return graph.ranks(ranks)
+
+
 def crawl(directory):
     """
     Parse a directory of HTML pages and check for links to other pages.
@@ -48,7 +95,7 @@ def crawl(directory):
     return pages
 
 
-def transition_model(corpus, page, damping_factor):
+def transition_model(corpus, page, damping_factor, teleport=None):
     """
     Return a probability distribution over which page to visit next,
     given a current page.
@@ -56,24 +103,30 @@ def transition_model(corpus, page, damping_factor):
     With probability `damping_factor`, choose a link at random
     linked to by `page`. With probability `1 - damping_factor`, choose
     a link at random chosen from all pages in the corpus.
+
+    If `teleport` is given, it maps pages to the probability of choosing
+    them when not following a link, in place of the uniform choice.
     """
     probability_distribution = {}
 
     number_of_links_current_page = len(corpus[page])
     number_of_pages_in_corpus = len(corpus)
 
+    if teleport is None:
+        teleport = {link: 1 / number_of_pages_in_corpus for link in corpus}
+
     if number_of_links_current_page != 0:
-        # Probability per page -> (1 - d) / N
+        # Probability per page -> (1 - d) * teleport probability
         for link in corpus:
-            probability_distribution[link] = (1 - damping_factor) / number_of_pages_in_corpus
+            probability_distribution[link] = (1 - damping_factor) * teleport.get(link, 0)
         
         # Probability per link in current page
         for link in corpus[page]:
             probability_distribution[link] += damping_factor / number_of_links_current_page
     else:
-        # Return a probability distribution that chooses randomly among all pages with equal probability
+        # Return a probability distribution that chooses among all pages according to the teleport probabilities
         for link in corpus:
-            probability_distribution[link] = 1 / number_of_pages_in_corpus
+            probability_distribution[link] = teleport.get(link, 0)
     
     return probability_distribution
 
@@ -114,10 +167,28 @@ def sample_pagerank(corpus, damping_factor, n):
     return pageRank
 
 
-def iterate_pagerank(corpus, damping_factor):
+def batch_sample_pagerank(corpus, damping_factor, n, surfers=SURFERS):
+    """
+    Return PageRank values for each page by sampling `n` pages with
+    `surfers` random surfers moving in lock-step, each starting on a
+    page at random and following the transition model.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    return graph.ranks(random_surfers(graph, damping_factor, n, surfers))
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                     max_iterations=MAX_ITERATIONS, callback=None):
     """
     Return PageRank values for each page by iteratively updating
-    PageRank values until convergence.
+    PageRank values until the total (L1) change of the PageRank values
+    drops below `tolerance`, or until `max_iterations` iterations have
+    been made. If `callback` is given, it is called with the iteration
+    number and that total change after every iteration.
 
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
@@ -129,7 +200,7 @@ def iterate_pagerank(corpus, damping_factor):
     # Initialize PageRank values
     pageRank = {page: 1 / number_of_pages_in_corpus for page in corpus}
 
-    while True:
+    for iteration in range(1, max_iterations + 1):
         new_pageranks = {page: (1 - damping_factor) / number_of_pages_in_corpus for page in corpus}
         
         # Updating the pageRanks
@@ -137,8 +208,11 @@ def iterate_pagerank(corpus, damping_factor):
             for linked_page in corpus[page]:
                 new_pageranks[linked_page] += (damping_factor * pageRank[page]) / len(corpus[page])
         
-        diff = max([abs(pageRank[page] - new_pageranks[page]) for page in corpus])
-        if diff < 0.001:
+        diff = sum(abs(pageRank[page] - new_pageranks[page]) for page in corpus)
+        if callback is not None:
+            callback(iteration, diff)
+
+        if diff < tolerance:
             break
         
         pageRank = new_pageranks
@@ -151,5 +225,63 @@ def iterate_pagerank(corpus, damping_factor):
     return normalized_final_pageRanks
 
 
+def sparse_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, method=METHOD, callback=None):
+    """
+    Return PageRank values for each page using vectorized iteration over
+    a sparse link matrix, stopping once the total (L1) change of the
+    rank vector drops below `tolerance` or after `max_iterations` iterations.
+    `method` names the solver: "power", "gauss-seidel", "aitken" or
+    "quadratic". `callback` is called as in `iterate_pagerank`.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    ranks, _ = solve(graph, damping_factor, tolerance, max_iterations,
+                     method, callback=callback)
+    return graph.ranks(ranks)
+
+
+def personalized_pagerank(corpus, damping_factor, seeds, tolerance=TOLERANCE,
+                          max_iterations=MAX_ITERATIONS):
+    """
+    Return personalized PageRank values for many seed sets in one pass.
+
+    `seeds` maps each name (a topic or a user, for example) to the pages
+    a random jump lands on, either as a collection of pages chosen with
+    equal probability or as a dictionary of page weights.
+
+    Return a dictionary mapping each name in `seeds` to a dictionary of
+    PageRank values, where keys are page names and values sum to 1.
+    Raise a ValueError if a seed set names a page not in the corpus, or
+    if its weights do not sum to more than 0.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    names = list(seeds)
+
+    # One column of teleport weights per seed set
+    teleports = np.zeros((graph.size, len(names)))
+    for column, name in enumerate(names):
+        weights = seeds[name]
+        if not isinstance(weights, dict):
+            weights = {page: 1 for page in weights}
+        for page, weight in weights.items():
+            if page not in graph.index:
+                raise ValueError(f"seed set {name!r} has page {page!r}, which is not in the corpus")
+            teleports[graph.index[page], column] = weight
+        if not teleports[:, column].sum() > 0:
+            raise ValueError(f"seed set {name!r} is empty or its weights sum to 0")
+
+    ranks, _ = personalized_power_iteration(
+        graph, damping_factor, teleports, tolerance, max_iterations
+    )
+    return {
+        name: graph.ranks(ranks[:, column])
+        for column, name in enumerate(names)
+    }
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file